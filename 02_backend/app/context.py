@@ -0,0 +1,73 @@
+import json
+import re
+from collections import defaultdict
+from typing import Optional
+
+STOPWORDS = {
+    "the", "and", "for", "with", "did", "does", "have", "has", "had", "was", "were", "are",
+    "what", "when", "where", "which", "who", "how", "why", "that", "this", "these", "those",
+    "from", "into", "about", "any", "all", "last", "my", "me", "i", "you", "your", "can",
+    "could", "would", "should", "been", "being", "than", "then", "there", "their", "they",
+    "day", "days", "time", "times", "take", "took", "get", "got",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for budgeting (about four characters per token)."""
+    return len(text) // 4 + 1
+
+
+def terms(text: str) -> set[str]:
+    return {w for w in re.findall(r"[a-z0-9]+", text.lower()) if len(w) > 2 and w not in STOPWORDS}
+
+
+def _value(v) -> str:
+    return v if isinstance(v, str) else json.dumps(v)
+
+
+def encode_event(e: dict) -> str:
+    """One line per event: time, type, text and non-empty metrics."""
+    line = f"{e.get('client_timestamp', '')[11:16]} {e.get('type', '')}: {e.get('text', '')}"
+    if e.get("metrics"):
+        line += " {" + ", ".join(f"{k}={_value(v)}" for k, v in e["metrics"].items()) + "}"
+    return line
+
+
+def encode_diary(d: dict) -> str:
+    answers = "; ".join(f"{k}={_value(v)}" for k, v in d.get("answers", {}).items() if v not in ("", None))
+    return f"diary: {answers}"
+
+
+def day_blocks(events: list[dict], diary: list[dict]) -> dict[str, str]:
+    """Group events and diary entries into one compact text block per day."""
+    lines = defaultdict(list)
+    for d in diary:
+        lines[d["date"]].append(encode_diary(d))
+    for e in sorted(events, key=lambda e: e.get("client_timestamp", "")):
+        lines[e.get("client_timestamp", "")[:10]].append(encode_event(e))
+    return {day: f"## {day}\n" + "\n".join(day_lines) for day, day_lines in lines.items()}
+
+
+def build_context(question: str, events: list[dict], diary: list[dict], budget: int,
+                  scores: Optional[dict[str, float]] = None) -> tuple[str, int]:
+    """Pack the most relevant, then most recent, days into ``budget`` tokens.
+
+    Relevance is the per-day score from ``scores`` when given (e.g. from
+    vector search), otherwise word overlap with the question. Returns the
+    packed blocks in chronological order and the number of days left out.
+    """
+    blocks = day_blocks(events, diary)
+    if scores is None:
+        wanted = terms(question)
+        scores = {day: len(wanted & terms(block)) for day, block in blocks.items()}
+    ranked = sorted(blocks, key=lambda day: (scores.get(day, 0), day), reverse=True)
+
+    chosen = []
+    used = 0
+    for day in ranked:
+        cost = estimate_tokens(blocks[day])
+        if used + cost > budget:
+            continue
+        chosen.append(day)
+        used += cost
+    return "\n\n".join(blocks[day] for day in sorted(chosen)), len(blocks) - len(chosen)
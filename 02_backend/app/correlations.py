@@ -0,0 +1,220 @@
+import json
+import os
+import re
+import threading
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+
+from app.context import STOPWORDS
+from app.index import fingerprint
+from app.jsonl import is_deleted, read_from
+from app.rollups import DATE
+from app.segments import log_stat
+
+INTENSITY_METRICS = ("intensity", "severity")
+
+
+def _labels(text: str) -> set[str]:
+    return {w for w in re.findall(r"[a-z]+", text.lower()) if len(w) > 2 and w not in STOPWORDS}
+
+
+def day_features(events: list[dict], diary: Optional[dict]) -> dict:
+    """Exposures and outcomes for one day.
+
+    Exposures are 1 for every word of the day's Intervention texts. Outcomes
+    are, for every word of the day's Symptom texts, the highest ``intensity``
+    or ``severity`` metric (1 when there is none), plus every numeric diary
+    answer. On a day with any events, symptom words not logged count as 0.
+    """
+    x: dict[str, float] = {}
+    y: dict[str, float] = {}
+    for e in events:
+        if e.get("type") == "Intervention":
+            for word in _labels(e.get("text", "")):
+                x[f"intervention:{word}"] = 1.0
+        elif e.get("type") == "Symptom":
+            metrics = e.get("metrics", {})
+            level = next((float(metrics[m]) for m in INTENSITY_METRICS
+                          if isinstance(metrics.get(m), (int, float)) and not isinstance(metrics.get(m), bool)), 1.0)
+            for word in _labels(e.get("text", "")):
+                y[f"symptom:{word}"] = max(y.get(f"symptom:{word}", 0.0), level)
+    if diary:
+        for k, v in diary.get("answers", {}).items():
+            if isinstance(v, (int, float)) and not isinstance(v, bool):
+                y[f"diary:{k}"] = float(v)
+    return {"x": x, "y": y, "logged": bool(events)}
+
+
+def correlate(days: dict[str, dict], max_lag: int = 3, min_exposed: int = 3) -> list[dict]:
+    """Lagged correlation and effect size of every exposure with every outcome.
+
+    For each lag ``L`` in ``0..max_lag``, exposure on day ``t`` is compared
+    with the outcome on day ``t + L`` across all days where the outcome is
+    known. ``r`` is the Pearson correlation and ``effect`` the mean outcome
+    on days after an exposure minus the mean on days after none. Pairs with
+    fewer than ``min_exposed`` exposed days are left out.
+    """
+    if not days:
+        return []
+    first, last = date.fromisoformat(min(days)), date.fromisoformat(max(days))
+    axis = [(first + timedelta(days=i)).isoformat() for i in range((last - first).days + 1)]
+    exposures = sorted({name for f in days.values() for name in f["x"]})
+    outcomes = sorted({name for f in days.values() for name in f["y"]})
+    if not exposures or not outcomes:
+        return []
+
+    x_col = {name: i for i, name in enumerate(exposures)}
+    y_col = {name: i for i, name in enumerate(outcomes)}
+    X = np.zeros((len(axis), len(exposures)))
+    Y = np.full((len(axis), len(outcomes)), np.nan)
+    for row, day in enumerate(axis):
+        f = days.get(day)
+        if f is None:
+            continue
+        for name, value in f["x"].items():
+            X[row, x_col[name]] = value
+        if f["logged"]:
+            # Symptoms not logged on a day with events count as absent
+            for name in outcomes:
+                if name.startswith("symptom:"):
+                    Y[row, y_col[name]] = 0.0
+        for name, value in f["y"].items():
+            Y[row, y_col[name]] = value
+
+    results = []
+    for lag in range(max_lag + 1):
+        if lag >= len(axis):
+            break
+        Xs, Ys = X[:len(axis) - lag], Y[lag:]
+        known = ~np.isnan(Ys)
+        Yz = np.where(known, Ys, 0.0)
+        M = known.astype(float)
+        # (exposure, outcome) matrices over the days where the outcome is known
+        n = np.broadcast_to(M.sum(axis=0), (len(exposures), len(outcomes)))
+        exposed = Xs.T @ M
+        sum_y_exposed = Xs.T @ Yz
+        sum_y = np.broadcast_to(Yz.sum(axis=0), n.shape)
+        sum_y2 = np.broadcast_to((Yz ** 2).sum(axis=0), n.shape)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean_x = exposed / n
+            mean_y = sum_y / n
+            cov = sum_y_exposed / n - mean_x * mean_y
+            var_x = mean_x - mean_x ** 2
+            var_y = sum_y2 / n - mean_y ** 2
+            r = cov / np.sqrt(var_x * var_y)
+            effect = sum_y_exposed / exposed - (sum_y - sum_y_exposed) / (n - exposed)
+        keep = (exposed >= min_exposed) & (n - exposed >= 1) & np.isfinite(r)
+        for i, j in zip(*np.nonzero(keep)):
+            results.append({
+                "exposure": exposures[i],
+                "outcome": outcomes[j],
+                "lag": lag,
+                "r": round(float(r[i, j]), 4),
+                "effect": round(float(effect[i, j]), 4),
+                "n": int(n[i, j]),
+                "exposed": int(exposed[i, j]),
+            })
+    results.sort(key=lambda res: abs(res["r"]), reverse=True)
+    return results
+
+
+class CorrelationEngine:
+    """Daily exposure/outcome features and correlation results, cached in one JSON file.
+
+    The cache records how far into events.jsonl and diary.jsonl it has
+    read. ``update`` reads only the lines appended since and recomputes the
+    features of the days they touch (including the day an edited or deleted
+    event used to be on). If a log was rewritten, every day is recomputed.
+    """
+
+    def __init__(self, cache: Path, events: Path, diary: Path):
+        self.cache = cache
+        self.sources = {"events": events, "diary": diary}
+        self._lock = threading.Lock()
+        self._state = None
+
+    def _empty(self) -> dict:
+        return {
+            "sources": {name: {"offset": 0, "fingerprint": ""} for name in self.sources},
+            "event_days": {},
+            "days": {},
+            "results": {},
+        }
+
+    def _load(self):
+        if self._state is not None:
+            return
+        try:
+            self._state = json.loads(self.cache.read_text())
+        except (FileNotFoundError, ValueError):
+            self._state = self._empty()
+
+    def _save(self):
+        self.cache.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.cache.with_name(f"{self.cache.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(self._state, separators=(",", ":")))
+        os.replace(tmp, self.cache)
+
+    def _touched(self) -> set[str]:
+        """Days affected by the lines appended since the last update."""
+        touched = set()
+        for name, path in self.sources.items():
+            source = self._state["sources"][name]
+            try:
+                size = log_stat(path).size
+            except FileNotFoundError:
+                size = 0
+            offset = source["offset"]
+            if offset > size or (offset and source["fingerprint"] != fingerprint(path, offset)):
+                # The log was rewritten — start over
+                self._state = self._empty()
+                return self._touched()
+            if size == offset:
+                continue
+            entries, offset = read_from(path, offset)
+            for _, entry in entries:
+                if name == "diary":
+                    touched.add(entry["date"])
+                    continue
+                day = entry.get("client_timestamp", "")[:10]
+                previous = self._state["event_days"].get(entry["id"])
+                touched.update(d for d in (day, previous) if d)
+                if is_deleted(entry):
+                    self._state["event_days"].pop(entry["id"], None)
+                else:
+                    self._state["event_days"][entry["id"]] = day
+            source["offset"] = offset
+            source["fingerprint"] = fingerprint(path, offset)
+        return touched
+
+    def update(self, day_events: Callable[[str], list[dict]], day_diary: Callable[[str], Optional[dict]]) -> int:
+        """Recompute features for the days touched since the last update; returns how many."""
+        with self._lock:
+            self._load()
+            touched = self._touched()
+            if not touched:
+                return 0
+            for day in touched:
+                if not DATE.match(day):
+                    continue
+                features = day_features(day_events(day), day_diary(day))
+                if features["x"] or features["y"] or features["logged"]:
+                    self._state["days"][day] = features
+                else:
+                    self._state["days"].pop(day, None)
+            self._state["results"] = {}
+            self._save()
+            return len(touched)
+
+    def results(self, max_lag: int = 3, min_exposed: int = 3) -> list[dict]:
+        """Correlation results for the current features, computed once per parameter set."""
+        with self._lock:
+            self._load()
+            key = f"{max_lag}:{min_exposed}"
+            if key not in self._state["results"]:
+                self._state["results"][key] = correlate(self._state["days"], max_lag, min_exposed)
+                self._save()
+            return self._state["results"][key]
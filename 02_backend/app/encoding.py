@@ -0,0 +1,44 @@
+import orjson
+
+from app.models.event import EventStored, FeedbackOut
+
+
+def _dumps(obj: dict, model) -> bytes:
+    try:
+        return orjson.dumps(obj)
+    except TypeError:
+        # Values orjson can't encode (e.g. integers over 64 bits) go through the model
+        return model(**obj).model_dump_json().encode()
+
+
+def event_json(e: dict) -> bytes:
+    """A stored event encoded exactly as ``EventStored`` would serialize it.
+
+    Records were validated when they were written, so only the response
+    fields are picked (in model order) and the defaults filled in.
+    """
+    return _dumps({
+        "id": e["id"],
+        "client_timestamp": e["client_timestamp"],
+        "type": e["type"],
+        "text": e["text"],
+        "metrics": e.get("metrics", {}),
+        "meta": {"version": e.get("meta", {}).get("version", 1)},
+        "received_at": e["received_at"],
+    }, EventStored)
+
+
+def feedback_json(fb: dict) -> bytes:
+    """A stored report encoded exactly as ``FeedbackOut`` would serialize it."""
+    return _dumps({
+        "id": fb["id"],
+        "type": fb["type"],
+        "text": fb["text"],
+        "created_at": fb["created_at"],
+        "attachment": fb.get("attachment"),
+        "meta": fb.get("meta", {"version": 1}),
+    }, FeedbackOut)
+
+
+def json_array(items: list[bytes]) -> bytes:
+    return b"[" + b",".join(items) + b"]"
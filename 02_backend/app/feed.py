@@ -0,0 +1,43 @@
+import asyncio
+import threading
+from contextlib import contextmanager
+
+
+class ChangeFeed:
+    """In-process pub/sub that wakes up stream clients when a log grows.
+
+    The append path calls ``publish`` (from any thread) after its write.
+    Each subscriber is an ``asyncio.Event`` set on the subscriber's own
+    loop. Notifications carry no data: subscribers read the new lines from
+    the log themselves, from their own cursor, so a slow or reconnecting
+    client can't miss or reorder a change, and a waiting one costs nothing.
+    """
+
+    def __init__(self):
+        self._subscribers: set[tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def subscribe(self):
+        """Register for notifications; yields the event to ``clear``, check the log, then ``wait`` on."""
+        subscriber = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            self._subscribers.add(subscriber)
+        try:
+            yield subscriber[1]
+        finally:
+            with self._lock:
+                self._subscribers.discard(subscriber)
+
+    def publish(self):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, event in subscribers:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass  # Loop already closed; the subscriber is going away
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
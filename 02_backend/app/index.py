@@ -0,0 +1,309 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from bisect import bisect_left, insort
+from pathlib import Path
+from typing import Callable, Optional
+
+from app.jsonl import is_deleted, read_from, read_range
+from app.segments import log_stat
+
+SNAPSHOT_EVERY = int(os.environ.get("HUXA_SNAPSHOT_EVERY", "1000"))
+
+log = logging.getLogger(__name__)
+
+
+def fingerprint(path: Path, offset: int) -> str:
+    """Hash of the bytes just before ``offset``, used to check a snapshot still matches its file."""
+    return hashlib.sha1(read_range(path, max(0, offset - 4096), offset)).hexdigest()
+
+
+class TailIndex:
+    """Base for in-memory views of an append-only JSONL file.
+
+    The view is loaded on first use and then kept current by parsing only the
+    bytes appended since the last refresh. Subclasses implement ``_clear``
+    and ``_apply``; every public read refreshes under the lock first. A
+    line ``_apply`` can't handle (a missing key, a null date) is logged
+    and skipped, so it doesn't hold back the lines after it; ``_apply``
+    raises before changing anything for such a line.
+
+    With a ``snapshot`` path and ``_state``/``_restore`` implemented, the
+    view is written there every ``SNAPSHOT_EVERY`` applied lines together
+    with the offset it covers. A cold start loads the snapshot and replays
+    only the tail of the log after that offset. The periodic write runs on
+    a background thread, so the request that crosses the threshold doesn't
+    wait for it; only ``_state`` runs under the lock.
+
+    With an ``encode`` function, records are also served as pre-encoded
+    JSON bytes, encoded on first read and cached until the record changes.
+    """
+
+    def __init__(self, path: Path, snapshot: Optional[Path] = None,
+                 encode: Optional[Callable[[dict], bytes]] = None):
+        self.path = path
+        self.snapshot = snapshot
+        self.encode = encode
+        self._lock = threading.Lock()
+        # Serializes snapshot writes; taken before _lock, never inside it
+        self._snapshot_lock = threading.Lock()
+        self._snapshot_due = False
+        self._reset(None)
+
+    def _reset(self, inode):
+        self._inode = inode
+        self._offset = 0
+        self._since_snapshot = 0
+        self._encoded: dict[str, bytes] = {}
+        self._clear()
+
+    def _clear(self):
+        raise NotImplementedError
+
+    def _apply(self, entry: dict):
+        raise NotImplementedError
+
+    def _state(self) -> dict:
+        """JSON-serializable view state for the snapshot.
+
+        It is encoded after the lock is released, so it must not share
+        containers that later ``_apply`` calls modify.
+        """
+        raise NotImplementedError
+
+    def _restore(self, state: dict):
+        """Load view state written by ``_state``."""
+        raise NotImplementedError
+
+    def _load(self, size: int):
+        if self.snapshot is None:
+            return
+        try:
+            snap = json.loads(self.snapshot.read_text())
+        except (FileNotFoundError, ValueError):
+            return
+        offset = snap.get("offset", 0)
+        if offset > size or snap.get("fingerprint") != fingerprint(self.path, offset):
+            return
+        self._restore(snap)
+        self._offset = offset
+
+    def _applied(self, count: int):
+        self._since_snapshot += count
+        if self.snapshot is not None and self._since_snapshot >= SNAPSHOT_EVERY and not self._snapshot_due:
+            self._snapshot_due = True
+            threading.Thread(target=self._write_snapshot, name=f"snapshot-{self.snapshot.name}", daemon=True).start()
+
+    def _write_snapshot(self):
+        with self._snapshot_lock:
+            with self._lock:
+                self._snapshot_due = False
+                if not self._since_snapshot:
+                    return
+                snap = {
+                    "offset": self._offset,
+                    "fingerprint": fingerprint(self.path, self._offset),
+                    **self._state(),
+                }
+                self._since_snapshot = 0
+            self.snapshot.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.snapshot.with_name(f"{self.snapshot.name}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(snap, separators=(",", ":")))
+            os.replace(tmp, self.snapshot)
+
+    def _raw(self, key: str, entry: dict) -> bytes:
+        raw = self._encoded.get(key)
+        if raw is None:
+            raw = self._encoded[key] = self.encode(entry)
+        return raw
+
+    def _refresh(self):
+        try:
+            st = log_stat(self.path)
+        except FileNotFoundError:
+            self._reset(None)
+            return
+        # A replaced or truncated file can't be tailed — start over
+        if st.inode != self._inode or st.size < self._offset:
+            self._reset(st.inode)
+            self._load(st.size)
+        if st.size == self._offset:
+            return
+        entries, end = read_from(self.path, self._offset)
+        for line_offset, entry in entries:
+            try:
+                self._apply(entry)
+            except (KeyError, TypeError, ValueError, AttributeError) as e:
+                log.warning("%s: skipping line at offset %d: %s: %s",
+                            self.path.name, line_offset, type(e).__name__, e)
+        self._offset = end
+        self._applied(len(entries))
+
+    def refresh(self):
+        with self._lock:
+            self._refresh()
+
+    def checkpoint(self):
+        """Write the snapshot now if lines were applied since the last one."""
+        if self.snapshot is not None:
+            self._write_snapshot()
+
+    @property
+    def indexed_bytes(self) -> int:
+        """Bytes of the log replayed into (or restored into) the view."""
+        return self._offset
+
+
+class EventIndex(TailIndex):
+    """In-memory view of events.jsonl: latest version per id, tombstones applied.
+
+    Live events are kept sorted by ``(client_timestamp, id)`` so date lookups
+    are a bisect plus a slice.
+
+    The snapshot holds the compacted state: the latest version per id,
+    delete markers included.
+    """
+
+    def _clear(self):
+        self._by_id: dict[str, dict] = {}
+        self._keys: list[tuple[str, str]] = []
+
+    def _state(self) -> dict:
+        return {"events": list(self._by_id.values())}
+
+    def _restore(self, state: dict):
+        for entry in state["events"]:
+            self._apply(entry)
+
+    def _apply(self, entry: dict):
+        if not isinstance(entry["id"], str) or not isinstance(entry.get("client_timestamp", ""), str):
+            raise TypeError("id and client_timestamp must be strings")
+        previous = self._by_id.get(entry["id"])
+        if previous is not None and not is_deleted(previous):
+            key = (previous.get("client_timestamp", ""), previous["id"])
+            i = bisect_left(self._keys, key)
+            if i < len(self._keys) and self._keys[i] == key:
+                del self._keys[i]
+        self._by_id[entry["id"]] = entry
+        self._encoded.pop(entry["id"], None)
+        if not is_deleted(entry):
+            insort(self._keys, (entry.get("client_timestamp", ""), entry["id"]))
+
+    def get(self, event_id: str) -> Optional[dict]:
+        """Latest version of ``event_id``, delete marker included, or None if never seen."""
+        with self._lock:
+            self._refresh()
+            return self._by_id.get(event_id)
+
+    def _out(self, keys: list[tuple[str, str]], raw: bool) -> list:
+        if raw:
+            return [self._raw(event_id, self._by_id[event_id]) for _, event_id in keys]
+        return [self._by_id[event_id] for _, event_id in keys]
+
+    def between(self, from_date: str, to_date: str, raw: bool = False) -> list:
+        """Live events whose ``client_timestamp`` date is in ``[from_date, to_date]``, oldest first.
+
+        With ``raw``, the events come back as their encoded JSON bytes.
+        """
+        with self._lock:
+            self._refresh()
+            lo = bisect_left(self._keys, (from_date,))
+            hi = bisect_left(self._keys, (to_date + "\uffff",))
+            return self._out(self._keys[lo:hi], raw)
+
+    def page(self, from_date: str, to_date: str, before: Optional[tuple[str, str]] = None,
+             limit: int = 100, raw: bool = False) -> tuple[list, Optional[tuple[str, str]]]:
+        """Newest-first page of live events in ``[from_date, to_date]``.
+
+        ``before`` is a ``(client_timestamp, id)`` key returned by a previous
+        call; only events strictly older than it are returned. The second
+        value is the key to pass as ``before`` for the next page, or None
+        when the range is exhausted. ``raw`` is as for ``between``.
+        """
+        with self._lock:
+            self._refresh()
+            lo = bisect_left(self._keys, (from_date,))
+            hi = bisect_left(self._keys, (to_date + "\uffff",))
+            if before is not None:
+                hi = min(hi, bisect_left(self._keys, before))
+            start = max(lo, hi - limit)
+            keys = self._keys[start:hi]
+            events = self._out(keys[::-1], raw)
+        return events, (keys[0] if keys and start > lo else None)
+
+    def live(self) -> list[dict]:
+        """All live events, oldest first."""
+        with self._lock:
+            self._refresh()
+            return [self._by_id[event_id] for _, event_id in self._keys]
+
+
+class DiaryIndex(TailIndex):
+    """In-memory view of diary.jsonl: latest entry per date, deleted markers applied."""
+
+    def _clear(self):
+        self._by_date: dict[str, dict] = {}
+        self._dates: list[str] = []
+
+    def _apply(self, entry: dict):
+        date = entry["date"]
+        if not isinstance(date, str):
+            raise TypeError("date must be a string")
+        live = date in self._by_date and not is_deleted(self._by_date[date])
+        self._by_date[date] = entry
+        if is_deleted(entry) and live:
+            del self._dates[bisect_left(self._dates, date)]
+        elif not is_deleted(entry) and not live:
+            insort(self._dates, date)
+
+    def get(self, date: str) -> Optional[dict]:
+        """Latest live entry for ``date``, or None."""
+        with self._lock:
+            self._refresh()
+            entry = self._by_date.get(date)
+        return None if entry is None or is_deleted(entry) else entry
+
+    def between(self, from_date: str, to_date: str) -> list[dict]:
+        """Latest live entries for the dates in ``[from_date, to_date]``, oldest first."""
+        with self._lock:
+            self._refresh()
+            lo = bisect_left(self._dates, from_date)
+            hi = bisect_left(self._dates, to_date + "\uffff")
+            return [self._by_date[date] for date in self._dates[lo:hi]]
+
+    def live(self) -> list[dict]:
+        """Latest live entry for every date, oldest first."""
+        with self._lock:
+            self._refresh()
+            return [self._by_date[date] for date in self._dates]
+
+
+class FeedbackIndex(TailIndex):
+    """In-memory view of feedback.jsonl: latest version of every report by id."""
+
+    def _clear(self):
+        self._by_id: dict[str, dict] = {}
+
+    def _apply(self, entry: dict):
+        self._by_id[entry["id"]] = entry
+        self._encoded.pop(entry["id"], None)
+
+    def get(self, report_id: str) -> Optional[dict]:
+        """Latest live version of ``report_id``, or None."""
+        with self._lock:
+            self._refresh()
+            entry = self._by_id.get(report_id)
+        return None if entry is None or is_deleted(entry) else entry
+
+    def live(self, raw: bool = False) -> list:
+        """Latest version of every live report, in order of first appearance.
+
+        With ``raw``, returns ``(report, encoded JSON bytes)`` pairs.
+        """
+        with self._lock:
+            self._refresh()
+            if raw:
+                return [(e, self._raw(key, e)) for key, e in self._by_id.items() if not is_deleted(e)]
+            return [e for e in self._by_id.values() if not is_deleted(e)]
@@ -0,0 +1,141 @@
+import json
+from pathlib import Path
+from typing import Optional
+
+from app import segments
+from app.metrics import record_read
+
+CHUNK_SIZE = 1 << 20
+
+
+def read_from(path: Path, offset: int, limit: Optional[int] = None) -> tuple[list[tuple[int, dict]], int]:
+    """Parse the complete lines of ``path`` that start at or after ``offset``.
+
+    Returns ``(entries, end)`` where ``entries`` holds ``(line_offset, entry)``
+    pairs and ``end`` is the offset just past the last line consumed. A
+    trailing line without its newline (a write still in progress) is left for
+    the next call. With ``limit``, reading stops after that many entries.
+
+    For a segmented log (see app.segments) offsets are logical: sealed
+    segments from ``offset`` on are decompressed as a stream, followed by
+    the active file.
+    """
+    entries: list[tuple[int, dict]] = []
+    manifest = segments.load(path)
+    if manifest is None:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            end = _parse(f, offset, limit, entries)
+    else:
+        end = _read_segmented(path, manifest, offset, limit, entries)
+    record_read(path, end - offset, len(entries))
+    return entries, end
+
+
+def _parse(f, pos: int, limit: Optional[int], entries: list) -> int:
+    """Append the complete lines read from ``f`` (at offset ``pos``) to ``entries``; returns the end offset."""
+    pending = b""
+    while limit is None or len(entries) < limit:
+        chunk = f.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        data = pending + chunk
+        cut = data.rfind(b"\n") + 1
+        pending = data[cut:]
+        for raw in data[:cut].split(b"\n")[:-1]:
+            if limit is not None and len(entries) >= limit:
+                return pos
+            if raw.strip():
+                entries.append((pos, json.loads(raw)))
+            pos += len(raw) + 1
+    return pos
+
+
+def _read_segmented(path: Path, manifest: dict, pos: int, limit: Optional[int], entries: list) -> int:
+    while True:
+        # Sealed segments never change, so they are read without the lock
+        for segment in manifest["segments"]:
+            if segment["start"] + segment["length"] <= pos:
+                continue
+            with segments.open_segment(path, segment) as f:
+                f.seek(pos - segment["start"])
+                pos = _parse(f, pos, limit, entries)
+            if limit is not None and len(entries) >= limit:
+                return pos
+        with segments.active(path) as (f, manifest, origin):
+            if pos >= origin:
+                f.seek(pos - origin)
+                return _parse(f, pos, limit, entries)
+        # The active file was sealed meanwhile; read the new segment first
+
+
+def read_range(path: Path, start: int, end: int) -> bytes:
+    """The bytes of the log between offsets ``start`` and ``end`` (logical for segmented logs)."""
+    manifest = segments.load(path)
+    if manifest is None:
+        with open(path, "rb") as f:
+            f.seek(start)
+            return f.read(end - start)
+    parts = []
+    for segment in manifest["segments"]:
+        segment_end = segment["start"] + segment["length"]
+        if segment_end <= start or segment["start"] >= end:
+            continue
+        with segments.open_segment(path, segment) as f:
+            f.seek(start - segment["start"])
+            parts.append(f.read(min(end, segment_end) - start))
+        start += len(parts[-1])
+    if start < end:
+        with segments.active(path) as (f, _, origin):
+            if start < origin:
+                # Sealed meanwhile
+                return b"".join(parts) + read_range(path, start, end)
+            f.seek(start - origin)
+            parts.append(f.read(end - start))
+    return b"".join(parts)
+
+
+def read_lines(path: Path, offsets: list[int]) -> list[dict]:
+    """Parse the lines starting at ``offsets`` (ascending, as recorded by ``read_from``)."""
+    entries = []
+    nbytes = 0
+    manifest = segments.load(path)
+    if manifest is None:
+        with open(path, "rb") as f:
+            for offset in offsets:
+                f.seek(offset)
+                line = f.readline()
+                nbytes += len(line)
+                entries.append(json.loads(line))
+        record_read(path, nbytes, len(entries))
+        return entries
+
+    i = 0
+    for segment in manifest["segments"]:
+        segment_end = segment["start"] + segment["length"]
+        if i == len(offsets) or offsets[i] >= segment_end:
+            continue
+        with segments.open_segment(path, segment) as f:
+            while i < len(offsets) and offsets[i] < segment_end:
+                f.seek(offsets[i] - segment["start"])
+                line = f.readline()
+                nbytes += len(line)
+                entries.append(json.loads(line))
+                i += 1
+    if i < len(offsets):
+        with segments.active(path) as (f, _, origin):
+            if offsets[i] < origin:
+                # Sealed meanwhile
+                record_read(path, nbytes, len(entries))
+                return entries + read_lines(path, offsets[i:])
+            for offset in offsets[i:]:
+                f.seek(offset - origin)
+                line = f.readline()
+                nbytes += len(line)
+                entries.append(json.loads(line))
+    record_read(path, nbytes, len(entries))
+    return entries
+
+
+def is_deleted(entry: dict) -> bool:
+    return bool(entry.get("meta", {}).get("deleted"))
@@ -0,0 +1,85 @@
+import asyncio
+import os
+import time
+from typing import Optional
+
+import httpx
+from openai import AsyncOpenAI
+
+from app.metrics import LLM_ERRORS, LLM_SECONDS, LLM_TOKENS, current_route
+
+MODEL = "gpt-4o-mini"
+MAX_CONCURRENCY = int(os.environ.get("HUXA_LLM_MAX_CONCURRENCY", "4"))
+TIMEOUT = float(os.environ.get("HUXA_LLM_TIMEOUT", "60"))
+MAX_RETRIES = int(os.environ.get("HUXA_LLM_MAX_RETRIES", "2"))
+
+
+class LLMBusy(Exception):
+    """All LLM slots are in use; the request is rejected instead of queued."""
+
+
+class LLMClient:
+    """Shared async OpenAI client with a cap on in-flight completions.
+
+    One pooled HTTP client is reused for every call. Timeouts and retries
+    (exponential backoff on connection errors, 429 and 5xx) are handled by
+    the OpenAI SDK. When ``max_concurrency`` calls are already running, new
+    calls fail fast with ``LLMBusy``. The base URL comes from
+    ``OPENAI_BASE_URL`` when set, so a local stub can stand in for the API.
+    Latency, token usage and errors are recorded per route in app.metrics.
+    """
+
+    def __init__(self, api_key: str, max_concurrency: int = MAX_CONCURRENCY,
+                 timeout: float = TIMEOUT, max_retries: int = MAX_RETRIES):
+        self.api_key = api_key
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self._client: Optional[AsyncOpenAI] = None
+
+    def _get_client(self) -> AsyncOpenAI:
+        if self._client is None:
+            self._client = AsyncOpenAI(
+                api_key=self.api_key,
+                timeout=self.timeout,
+                max_retries=self.max_retries,
+                http_client=httpx.AsyncClient(
+                    timeout=self.timeout,
+                    limits=httpx.Limits(
+                        max_connections=self.max_concurrency,
+                        max_keepalive_connections=self.max_concurrency,
+                    ),
+                ),
+            )
+        return self._client
+
+    async def complete(self, messages: list[dict], **kwargs) -> str:
+        """Run one chat completion and return the message content."""
+        route = current_route()
+        if self._semaphore.locked():
+            LLM_ERRORS.inc(route, LLMBusy.__name__)
+            raise LLMBusy()
+        async with self._semaphore:
+            self.in_flight += 1
+            start = time.perf_counter()
+            try:
+                response = await self._get_client().chat.completions.create(
+                    model=MODEL, messages=messages, **kwargs,
+                )
+            except Exception as e:
+                LLM_ERRORS.inc(route, type(e).__name__)
+                raise
+            finally:
+                self.in_flight -= 1
+                LLM_SECONDS.observe(time.perf_counter() - start, route)
+        if response.usage is not None:
+            LLM_TOKENS.inc(route, "prompt", value=response.usage.prompt_tokens)
+            LLM_TOKENS.inc(route, "completion", value=response.usage.completion_tokens)
+        return response.choices[0].message.content
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+
+class LLMCache:
+    """Persistent LRU cache of LLM results, keyed by a hash of the exact prompt inputs.
+
+    Each entry is one JSON file under ``directory``; recency is kept in the
+    file mtime so the LRU order survives restarts. When the total size goes
+    over ``max_bytes`` the least recently used entries are removed.
+
+    Keys are content hashes, so a changed prompt never hits a stale entry.
+    Entries also carry tags (e.g. the date a summary covers) so appends can
+    drop results that can no longer be hit instead of waiting for eviction.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int = 20 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: Optional[OrderedDict[str, tuple[int, list[str]]]] = None
+        self._bytes = 0
+
+    @staticmethod
+    def key(*parts) -> str:
+        data = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(data.encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        self._entries = OrderedDict()
+        self._bytes = 0
+        if not self.directory.exists():
+            return
+        files = sorted(self.directory.glob("*.json"), key=lambda p: p.stat().st_mtime_ns)
+        for path in files:
+            try:
+                tags = json.loads(path.read_text())["tags"]
+            except (OSError, ValueError, KeyError):
+                path.unlink(missing_ok=True)
+                continue
+            size = path.stat().st_size
+            self._entries[path.stem] = (size, tags)
+            self._bytes += size
+
+    def _remove(self, key: str):
+        size, _ = self._entries.pop(key)
+        self._bytes -= size
+        self._path(key).unlink(missing_ok=True)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            self._load()
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            try:
+                value = json.loads(self._path(key).read_text())["value"]
+                os.utime(self._path(key))
+            except (OSError, ValueError, KeyError):
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: str, tags: list[str] = ()):
+        data = json.dumps({"value": value, "tags": list(tags)})
+        with self._lock:
+            self._load()
+            if key in self._entries:
+                self._remove(key)
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp = self._path(key).with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(data)
+            os.replace(tmp, self._path(key))
+            self._entries[key] = (len(data.encode()), list(tags))
+            self._bytes += len(data.encode())
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, *tags: str):
+        """Drop every entry carrying any of ``tags``."""
+        wanted = set(tags)
+        with self._lock:
+            self._load()
+            for key in [k for k, (_, t) in self._entries.items() if wanted.intersection(t)]:
+                self._remove(key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._load()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
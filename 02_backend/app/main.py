@@ -1,26 +1,69 @@
+import asyncio
+import base64
+import hashlib
+import hmac
 import json
 import os
+import threading
+import time
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Optional
 
-from fastapi import FastAPI, Depends, HTTPException, Query, UploadFile, File, status
+from fastapi import FastAPI, Depends, Header, HTTPException, Query, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-
-from openai import OpenAI
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
 
 from app.models.event import (
-    EventIn, EventStored, QueryIn, QueryOut,
+    EventIn, EventStored, EventBatchOut, EventBatchResult, EventChangesOut,
+    QueryIn, QueryOut, SearchOut, StatsOut, StatsSeries, CorrelationsOut,
     DiaryIn, DiaryOut, DiarySummaryOut,
     DiaryParseIn, DiaryParseOut,
     FeedbackIn, FeedbackOut,
 )
+from app.context import build_context
+from app.correlations import CorrelationEngine
+from app.encoding import event_json, feedback_json, json_array
+from app.feed import ChangeFeed
+from app.index import DiaryIndex, EventIndex, FeedbackIndex
+from app.jsonl import read_from, read_range
+from app.llm import MODEL, LLMBusy, LLMClient
+from app.llm_cache import LLMCache
+from app.metrics import REGISTRY, Gauge, MetricsMiddleware, SlowRequestProfiler
+from app.offsets import DayOffsetIndex
+from app.retrieval import VectorStore, diary_key, event_key, get_embedder
+from app.rollups import BUCKETS, SeriesIndex, diary_values, event_values, rollup
+from app.search import SearchIndex, TextIndex, diary_doc, event_doc
+from app.segments import log_stat
+from app.uploads import receive_file
+from app.writer import AppendWriter, WriterBusy
 
 import uuid
-
-app = FastAPI(title="HuXa", version="0.1.0")
+from contextlib import asynccontextmanager
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build the in-memory indexes before serving the first request
+    await run_in_threadpool(events_index.refresh)
+    await run_in_threadpool(diary_index.refresh)
+    await run_in_threadpool(search_index.refresh)
+    await run_in_threadpool(events_series.refresh)
+    await run_in_threadpool(diary_series.refresh)
+    await run_in_threadpool(vector_store.refresh)
+    yield
+    # Write what is still queued before the process exits
+    for writer in (events_writer, diary_writer, feedback_writer):
+        await run_in_threadpool(writer.close)
+    for index in (events_by_day, events_index, events_search, diary_search, events_series, diary_series):
+        await run_in_threadpool(index.checkpoint)
+    await llm.aclose()
+
+
+app = FastAPI(title="HuXa", version="0.1.0", lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["https://huxa.is", "http://localhost:8081", "tauri://localhost"],
@@ -28,13 +71,77 @@ app.add_middleware(
     allow_headers=["Authorization", "Content-Type"],
 )
 security = HTTPBearer()
+optional_bearer = HTTPBearer(auto_error=False)
 
 EVENTS_FILE = Path(os.environ.get("HUXA_EVENTS_FILE", "/var/lib/huxa/events.jsonl"))
 DIARY_FILE = Path(os.environ.get("HUXA_DIARY_FILE", "/var/lib/huxa/diary.jsonl"))
 FEEDBACK_FILE = Path(os.environ.get("HUXA_FEEDBACK_FILE", "/var/lib/huxa/feedback.jsonl"))
 ATTACHMENTS_DIR = Path(os.environ.get("HUXA_ATTACHMENTS_DIR", "/var/lib/huxa/attachments"))
+# Internal nginx location that maps to ATTACHMENTS_DIR, e.g. "/_attachments/".
+# When set, attachment bytes are served by nginx via X-Accel-Redirect.
+ATTACHMENTS_ACCEL = os.environ.get("HUXA_ATTACHMENTS_ACCEL", "")
+DERIVED_DIR = Path(os.environ.get("HUXA_DERIVED_DIR", "/var/lib/huxa/derived"))
 AUTH_TOKEN = os.environ.get("HUXA_AUTH_TOKEN", "")
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY", "")
+FSYNC = os.environ.get("HUXA_FSYNC", "none")
+
+llm = LLMClient(OPENAI_API_KEY)
+llm_cache = LLMCache(
+    DERIVED_DIR / "llm_cache",
+    max_bytes=int(os.environ.get("HUXA_LLM_CACHE_MAX_BYTES", str(20 * 1024 * 1024))),
+)
+
+events_writer = AppendWriter(EVENTS_FILE, fsync=FSYNC)
+diary_writer = AppendWriter(DIARY_FILE, fsync=FSYNC)
+feedback_writer = AppendWriter(FEEDBACK_FILE, fsync=FSYNC)
+
+events_index = EventIndex(EVENTS_FILE, snapshot=DERIVED_DIR / "events.snapshot.json", encode=event_json)
+events_by_day = DayOffsetIndex(
+    EVENTS_FILE,
+    DERIVED_DIR / "events.days.json",
+    day=lambda e: e.get("client_timestamp", "")[:10],
+    ident=lambda e: e["id"],
+)
+diary_index = DiaryIndex(DIARY_FILE)
+feedback_index = FeedbackIndex(FEEDBACK_FILE, encode=feedback_json)
+events_search = TextIndex(EVENTS_FILE, event_doc, snapshot=DERIVED_DIR / "search.events.json")
+diary_search = TextIndex(DIARY_FILE, diary_doc, snapshot=DERIVED_DIR / "search.diary.json")
+search_index = SearchIndex(events_search, diary_search)
+events_series = SeriesIndex(EVENTS_FILE, event_values, snapshot=DERIVED_DIR / "series.events.json")
+diary_series = SeriesIndex(DIARY_FILE, diary_values, snapshot=DERIVED_DIR / "series.diary.json")
+correlations = CorrelationEngine(DERIVED_DIR / "correlations.json", EVENTS_FILE, DIARY_FILE)
+# Wakes up GET /events/stream clients after every append to events.jsonl
+events_feed = ChangeFeed()
+# Seconds between keepalive comments on an idle stream; each one also picks
+# up lines appended by other processes
+STREAM_KEEPALIVE = float(os.environ.get("HUXA_STREAM_KEEPALIVE", "15"))
+STREAM_BATCH = 500
+# Lifetime of the query-string tokens that open an event stream
+STREAM_TOKEN_SECONDS = 60
+
+# Serializes the "already stored?" check with the append in batch ingest
+ingest_lock = threading.Lock()
+MAX_BATCH_EVENTS = 1000
+QUERY_TOKEN_BUDGET = int(os.environ.get("HUXA_QUERY_TOKEN_BUDGET", "60000"))
+RETRIEVAL_TOP_K = int(os.environ.get("HUXA_RETRIEVAL_TOP_K", "300"))
+
+vector_store = VectorStore(DERIVED_DIR / "vectors", get_embedder(os.environ.get("HUXA_EMBEDDER", "hashing")),
+                           EVENTS_FILE, DIARY_FILE)
+
+# Requests slower than this many milliseconds get a sampled profile written
+# to DERIVED_DIR/profiles; unset leaves the profiler off
+PROFILE_SLOW_MS = os.environ.get("HUXA_PROFILE_SLOW_MS", "")
+app.add_middleware(
+    MetricsMiddleware,
+    profiler=SlowRequestProfiler(DERIVED_DIR / "profiles", int(PROFILE_SLOW_MS) / 1000) if PROFILE_SLOW_MS else None,
+)
+REGISTRY.register(Gauge(
+    "huxa_llm_in_flight", "OpenAI calls currently running.", read=lambda: {(): llm.in_flight}))
+REGISTRY.register(Gauge(
+    "huxa_append_queue", "Appends waiting for the writer thread.", ("file",),
+    read=lambda: {(w.path.name,): w.pending for w in (events_writer, diary_writer, feedback_writer)}))
+REGISTRY.register(Gauge(
+    "huxa_event_stream_clients", "Open GET /events/stream connections.", read=lambda: {(): events_feed.subscribers}))
 
 
 def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
@@ -47,20 +154,133 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
         )
 
 
+def _stream_token_signature(expires: int) -> str:
+    return hmac.new(AUTH_TOKEN.encode(), f"events-stream:{expires}".encode(), hashlib.sha256).hexdigest()
+
+
+def new_stream_token() -> str:
+    """A token that can only open ``/events/stream``, valid for ``STREAM_TOKEN_SECONDS``."""
+    expires = int(time.time()) + STREAM_TOKEN_SECONDS
+    return f"{expires}.{_stream_token_signature(expires)}"
+
+
+def verify_stream_token(
+    token: Optional[str] = Query(None),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_bearer),
+):
+    """Bearer header, or a stream token in the query string (EventSource can't send headers)."""
+    if not AUTH_TOKEN:
+        return
+    if credentials is not None and credentials.credentials == AUTH_TOKEN:
+        return
+    if token:
+        expires, _, signature = token.partition(".")
+        if (expires.isdigit() and int(expires) >= time.time()
+                and hmac.compare_digest(signature, _stream_token_signature(int(expires)))):
+            return
+    raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+
+
+@app.exception_handler(WriterBusy)
+def writer_busy(request, exc):
+    return JSONResponse(status_code=503, content={"detail": "Server busy, try again"})
+
+
+@app.exception_handler(LLMBusy)
+def llm_busy(request, exc):
+    return JSONResponse(status_code=503, content={"detail": "Too many AI requests in flight, try again shortly"})
+
+
+def _append_events(records: list[dict]):
+    """Append records to events.jsonl and bring derived state up to date."""
+    previous = [events_index.get(r["id"]) for r in records]
+    events_writer.append_many(records)
+    events_by_day.refresh()
+    events_search.refresh()
+    events_series.refresh()
+    events_feed.publish()
+    vector_store.refresh()
+    # Summaries of the touched days (including the day an edited or deleted
+    # event used to be on) and every /query answer can no longer be hit
+    dates = {e.get("client_timestamp", "")[:10] for e in records + [p for p in previous if p]}
+    llm_cache.invalidate("query", *(f"summary:{d}" for d in dates))
+
+
+def _append_diary(record: dict):
+    """Append a record to diary.jsonl and bring derived state up to date."""
+    diary_writer.append(record)
+    diary_index.refresh()
+    diary_search.refresh()
+    diary_series.refresh()
+    vector_store.refresh()
+    llm_cache.invalidate("query")
+
+
+async def _complete_cached(tags: list[str], messages: list[dict], **kwargs) -> str:
+    """Run a completion through the LLM cache, keyed by the exact prompt inputs."""
+    key = LLMCache.key(MODEL, messages, kwargs)
+    cached = await run_in_threadpool(llm_cache.get, key)
+    if cached is not None:
+        return cached
+    content = await llm.complete(messages, **kwargs)
+    await run_in_threadpool(llm_cache.put, key, content, tags)
+    return content
+
+
 @app.get("/health")
 def health():
     return {"status": "ok"}
 
 
+@app.get("/llm/cache", dependencies=[Depends(verify_token)])
+def llm_cache_stats():
+    return llm_cache.stats()
+
+
+@app.get("/metrics", dependencies=[Depends(verify_token)])
+def prometheus_metrics():
+    # Per process: with several uvicorn workers each scrape sees one of them
+    return Response(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+STREAM_PAGE_SIZE = 500
+
+
+def _encode_cursor(key: tuple[str, str]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[str, str]:
+    try:
+        timestamp, event_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(timestamp), str(event_id)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _stream_events(filter_from: str, filter_to: str, before, limit: Optional[int]):
+    # Pull the range from the index one page at a time so memory stays flat
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = STREAM_PAGE_SIZE if remaining is None else min(remaining, STREAM_PAGE_SIZE)
+        events, before = events_index.page(filter_from, filter_to, before, size, raw=True)
+        for raw in events:
+            yield raw + b"\n"
+        if remaining is not None:
+            remaining -= len(events)
+        if before is None:
+            return
+
+
 @app.get("/events", dependencies=[Depends(verify_token)])
 def list_events(
     date: Optional[str] = Query(None),
     from_date: Optional[str] = Query(None, alias="from"),
     to_date: Optional[str] = Query(None, alias="to"),
+    limit: Optional[int] = Query(None, ge=1, le=5000),
+    cursor: Optional[str] = Query(None),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
 ) -> list[EventStored]:
-    if not EVENTS_FILE.exists():
-        return []
-
     # Determine date filter
     if from_date and to_date:
         filter_from = from_date
@@ -71,21 +291,29 @@ def list_events(
     else:
         filter_from = filter_to = datetime.now(timezone.utc).strftime("%Y-%m-%d")
 
-    # Use dict to deduplicate by ID (latest version wins)
-    # Scan all lines so delete markers (which have the deletion timestamp,
-    # not the original event timestamp) are always picked up.
-    by_id = {}
-    for line in EVENTS_FILE.read_text().strip().splitlines():
-        if not line.strip():
-            continue
-        entry = json.loads(line)
-        by_id[entry["id"]] = entry
+    before = _decode_cursor(cursor) if cursor else None
 
-    results = [EventStored(**e) for e in by_id.values()
-               if not e.get("meta", {}).get("deleted")
-               and filter_from <= e.get("client_timestamp", "")[:10] <= filter_to]
-    results.sort(key=lambda e: e.client_timestamp, reverse=True)
-    return results
+    if format == "ndjson":
+        # Streamed responses can't carry a next-page header; clients resume
+        # from the last line they received.
+        return StreamingResponse(
+            _stream_events(filter_from, filter_to, before, limit),
+            media_type="application/x-ndjson",
+        )
+
+    # The index deduplicates by ID (latest version wins) and applies delete
+    # markers, which carry the deletion timestamp rather than the original
+    # event timestamp, so only the requested range needs to be materialized.
+    # Events are served as JSON bytes encoded once per version by the index
+    # (validated on write), skipping per-request model construction.
+    if limit is None and before is None:
+        results = events_index.between(filter_from, filter_to, raw=True)
+        results.reverse()
+        return Response(json_array(results), media_type="application/json")
+
+    events, next_key = events_index.page(filter_from, filter_to, before, limit or STREAM_PAGE_SIZE, raw=True)
+    headers = {"X-Next-Cursor": _encode_cursor(next_key)} if next_key is not None else None
+    return Response(json_array(events), media_type="application/json", headers=headers)
 
 
 @app.post("/events", status_code=201, dependencies=[Depends(verify_token)])
@@ -102,14 +330,186 @@ def create_event(event: EventIn) -> EventStored:
         meta=event.meta,
     )
 
-    EVENTS_FILE.parent.mkdir(parents=True, exist_ok=True)
-
-    with open(EVENTS_FILE, "a") as f:
-        f.write(json.dumps(stored.model_dump(), default=str) + "\n")
+    _append_events([stored.model_dump(mode="json")])
 
     return stored
 
 
+def _parse_batch(body: bytes, content_type: str) -> list:
+    """Split a batch body into raw items: a JSON array, or NDJSON (one object per line)."""
+    text = body.decode("utf-8").strip()
+    if "ndjson" not in content_type and text.startswith("["):
+        items = json.loads(text)
+        if not isinstance(items, list):
+            raise ValueError("Expected a JSON array")
+        return items
+    items = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        try:
+            items.append(json.loads(line))
+        except ValueError as e:
+            items.append(e)
+    return items
+
+
+def _ingest_batch(items: list) -> list[EventBatchResult]:
+    received_at = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    results = []
+    accepted = {}
+
+    for index, item in enumerate(items):
+        if isinstance(item, Exception):
+            results.append(EventBatchResult(index=index, status="invalid", error=f"Invalid JSON: {item}"))
+            continue
+        try:
+            event = EventIn.model_validate(item)
+        except ValidationError as e:
+            error = "; ".join(f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors())
+            item_id = item.get("id") if isinstance(item, dict) else None
+            results.append(EventBatchResult(index=index, id=item_id, status="invalid", error=error))
+            continue
+        stored = EventStored(received_at=received_at, **event.model_dump())
+        results.append(EventBatchResult(index=index, id=event.id, status="created"))
+        accepted[index] = stored
+
+    with ingest_lock:
+        to_write = []
+        latest = {}
+        for index, stored in accepted.items():
+            record = stored.model_dump(mode="json")
+            # Retried batches must not append a second copy. A record whose
+            # content matches the latest stored version is a duplicate; a
+            # changed record under a known id is a queued offline edit.
+            previous = latest.get(stored.id) or events_index.get(stored.id)
+            if previous is not None and previous.get("meta", {}).get("deleted"):
+                results[index].status = "deleted"
+            elif previous is not None and all(previous.get(k) == record[k] for k in record if k != "received_at"):
+                results[index].status = "duplicate"
+            else:
+                latest[stored.id] = record
+                to_write.append(record)
+        if to_write:
+            _append_events(to_write)
+    return results
+
+
+@app.post("/events/batch", dependencies=[Depends(verify_token)])
+async def create_events_batch(request: Request) -> EventBatchOut:
+    try:
+        items = _parse_batch(await request.body(), request.headers.get("content-type", ""))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid batch body: {e}")
+    if len(items) > MAX_BATCH_EVENTS:
+        raise HTTPException(status_code=413, detail=f"Too many events in one batch (max {MAX_BATCH_EVENTS})")
+
+    results = await run_in_threadpool(_ingest_batch, items)
+    return EventBatchOut(results=results)
+
+
+def _events_size() -> int:
+    try:
+        return log_stat(EVENTS_FILE).size
+    except FileNotFoundError:
+        return 0
+
+
+def _change_cursor(since: str) -> tuple[int, int]:
+    """Validate a change cursor; returns ``(offset, current log size)``."""
+    # events.jsonl is append-only, so a byte offset is a natural change cursor
+    # (a logical one across sealed segments, which keeps it stable)
+    try:
+        offset = int(since)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    size = _events_size()
+    if offset < 0 or offset > size:
+        raise HTTPException(status_code=410, detail="Cursor is no longer valid, resync from 0")
+    if offset > 0 and read_range(EVENTS_FILE, offset - 1, offset) != b"\n":
+        raise HTTPException(status_code=400, detail="Cursor does not point at a line boundary")
+    return offset, size
+
+
+@app.get("/events/changes", dependencies=[Depends(verify_token)])
+def list_event_changes(
+    since: str = Query("0"),
+    limit: int = Query(1000, ge=1, le=10000),
+) -> EventChangesOut:
+    offset, size = _change_cursor(since)
+    if offset == size:
+        return EventChangesOut(changes=[], cursor=str(offset), more=False)
+
+    entries, end = read_from(EVENTS_FILE, offset, limit=limit)
+    return EventChangesOut(
+        changes=[entry for _, entry in entries],
+        cursor=str(end),
+        more=len(entries) == limit and end < size,
+    )
+
+
+def _read_changes(offset: int) -> Optional[tuple[list[tuple[int, dict]], int]]:
+    """The next batch of lines after ``offset``, or None if the log shrank under the cursor."""
+    size = _events_size()
+    if size < offset:
+        return None
+    if size == offset:
+        return [], offset
+    return read_from(EVENTS_FILE, offset, limit=STREAM_BATCH)
+
+
+async def _stream_changes(offset: int):
+    with events_feed.subscribe() as changed:
+        # Confirms the starting cursor, so a client can resume even if
+        # nothing happens before it disconnects
+        yield f"retry: 3000\nid: {offset}\nevent: ready\ndata: {{}}\n\n".encode()
+        while True:
+            # Cleared before reading, so an append during the read wakes the next wait
+            changed.clear()
+            batch = await run_in_threadpool(_read_changes, offset)
+            if batch is None:
+                yield b"event: reset\ndata: {}\n\n"
+                return
+            entries, end = batch
+            for i, (_, entry) in enumerate(entries):
+                # The id is the cursor just past this line, which is what
+                # EventSource sends back as Last-Event-ID on reconnect
+                cursor = entries[i + 1][0] if i + 1 < len(entries) else end
+                yield f"id: {cursor}\nevent: change\ndata: {json.dumps(entry)}\n\n".encode()
+            offset = end
+            if len(entries) == STREAM_BATCH:
+                continue
+            try:
+                await asyncio.wait_for(changed.wait(), STREAM_KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+
+
+@app.post("/events/stream/token", dependencies=[Depends(verify_token)])
+def create_stream_token() -> dict:
+    return {"token": new_stream_token(), "expires_in": STREAM_TOKEN_SECONDS}
+
+
+@app.get("/events/stream", dependencies=[Depends(verify_stream_token)])
+async def stream_event_changes(
+    since: Optional[str] = Query(None),
+    last_event_id: Optional[str] = Header(None),
+):
+    # A reconnecting EventSource resumes from the last id it received;
+    # without a cursor the stream starts at the current end of the log.
+    # The token is only checked when the stream opens.
+    cursor = last_event_id or since
+    if cursor is None:
+        offset = await run_in_threadpool(_events_size)
+    else:
+        offset, _ = await run_in_threadpool(_change_cursor, cursor)
+    return StreamingResponse(
+        _stream_changes(offset),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.put("/events/{event_id}", dependencies=[Depends(verify_token)])
 def update_event(event_id: str, event: EventIn) -> EventStored:
     received_at = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
@@ -124,8 +524,7 @@ def update_event(event_id: str, event: EventIn) -> EventStored:
         meta=event.meta,
     )
 
-    with open(EVENTS_FILE, "a") as f:
-        f.write(json.dumps(stored.model_dump(), default=str) + "\n")
+    _append_events([stored.model_dump(mode="json")])
 
     return stored
 
@@ -141,68 +540,130 @@ def delete_event(event_id: str):
         "metrics": {},
         "meta": {"version": 1, "deleted": True},
     }
-    with open(EVENTS_FILE, "a") as f:
-        f.write(json.dumps(deleted) + "\n")
+    _append_events([deleted])
     return {"status": "deleted"}
 
 
+def _query_context(q: QueryIn) -> tuple[str, int]:
+    from_date = q.from_date or ""
+    to_date = q.to_date or "9999-12-31"
+    events = events_index.between(from_date, to_date)
+    if q.types:
+        events = [e for e in events if e.get("type") in q.types]
+    diary = diary_index.between(from_date, to_date)
+    context, omitted = build_context(q.question, events, diary, QUERY_TOKEN_BUDGET)
+    if not omitted:
+        return context, omitted
+
+    # Too much to send everything: rank days by the summed similarity of
+    # their records among the closest matches to the question. Days without
+    # a match still fill the rest of the budget, most recent first, so
+    # nothing is dropped for lack of a vector or a positive score.
+    hits = dict(vector_store.search(q.question, RETRIEVAL_TOP_K))
+    if not hits:
+        return context, omitted
+    scores = {}
+    for e in events:
+        if event_key(e) in hits:
+            day = e.get("client_timestamp", "")[:10]
+            scores[day] = scores.get(day, 0.0) + hits[event_key(e)]
+    for d in diary:
+        if diary_key(d) in hits:
+            scores[d["date"]] = scores.get(d["date"], 0.0) + hits[diary_key(d)]
+    return build_context(q.question, events, diary, QUERY_TOKEN_BUDGET, scores)
+
+
 @app.post("/query", dependencies=[Depends(verify_token)])
-def query_events(q: QueryIn) -> QueryOut:
+async def query_events(q: QueryIn) -> QueryOut:
     if not OPENAI_API_KEY:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="OpenAI API key not configured",
         )
 
-    events_text = ""
-    if EVENTS_FILE.exists():
-        by_id = {}
-        for line in EVENTS_FILE.read_text().strip().splitlines():
-            if not line.strip():
-                continue
-            entry = json.loads(line)
-            by_id[entry["id"]] = (line, entry)
-        events_text = "\n".join(line for line, entry in by_id.values() if not entry.get("meta", {}).get("deleted"))
-
-    diary_text = ""
-    if DIARY_FILE.exists():
-        by_date = {}
-        for line in DIARY_FILE.read_text().strip().splitlines():
-            if not line.strip():
-                continue
-            entry = json.loads(line)
-            by_date[entry["date"]] = line
-        diary_text = "\n".join(by_date.values())
+    context, omitted = await run_in_threadpool(_query_context, q)
 
-    if not events_text and not diary_text:
+    if not context:
         return QueryOut(answer="No data has been logged yet.")
+    if omitted:
+        context += f"\n\n({omitted} older or less relevant days not included)"
 
-    client = OpenAI(api_key=OPENAI_API_KEY)
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
+    answer = await _complete_cached(
+        ["query"],
         messages=[
             {
                 "role": "system",
                 "content": (
-                    "You are analyzing a personal health/life log containing two data sources:\n"
-                    "1. Events — each line is JSON with fields: id, client_timestamp, received_at, type, text, metrics, meta\n"
-                    "2. Diary entries — each line is JSON with fields: id, date, answers (object with keys like "
-                    "sleep, headaches, energy, gut, physical, hip_pain, mental, life, gratitude, activity), saved_at, meta\n\n"
+                    "You are analyzing a personal health/life log, grouped by day under '## YYYY-MM-DD' headings.\n"
+                    "- Event lines: 'HH:MM Type: text {metric=value, ...}' (times are UTC; "
+                    "types are Event, Intervention, Symptom, Decision, Thought)\n"
+                    "- Diary lines: 'diary: key=value; ...' with keys like "
+                    "sleep, headaches, energy, gut, physical, hip_pain, mental, life, gratitude, activity\n\n"
                     "Answer the user's question based on this data. Be concise and helpful."
                 ),
             },
             {
                 "role": "user",
-                "content": f"Events:\n{events_text}\n\nDiary:\n{diary_text}\n\nQuestion: {q.question}",
+                "content": f"{context}\n\nQuestion: {q.question}",
             },
         ],
     )
 
-    return QueryOut(answer=response.choices[0].message.content)
+    return QueryOut(answer=answer)
+
+
+@app.get("/search", dependencies=[Depends(verify_token)])
+def search(
+    q: str,
+    from_date: Optional[str] = Query(None, alias="from"),
+    to_date: Optional[str] = Query(None, alias="to"),
+    sort: str = Query("relevance", pattern="^(relevance|recent)$"),
+    limit: int = Query(20, ge=1, le=200),
+) -> SearchOut:
+    results = search_index.search(q, from_date or "", to_date or "9999-12-31", sort, limit)
+    return SearchOut(results=results)
+
+
+@app.get("/stats", dependencies=[Depends(verify_token)])
+def get_stats(
+    series: Optional[str] = Query(None, description="Comma-separated series names (default: all)"),
+    from_date: str = Query("0001-01-01", alias="from"),
+    to_date: str = Query("9999-12-31", alias="to"),
+    bucket: str = Query("day", pattern="^(" + "|".join(BUCKETS) + ")$"),
+) -> StatsOut:
+    try:
+        datetime.strptime(from_date, "%Y-%m-%d"), datetime.strptime(to_date, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="from and to must be YYYY-MM-DD")
+
+    names = series.split(",") if series else events_series.series() + diary_series.series()
+    results = []
+    for name in names:
+        index = diary_series if name.startswith("diary.") else events_series
+        columns = index.columns(name)
+        if columns is not None:
+            results.append(StatsSeries(name=name, **rollup(columns, from_date, to_date, bucket)))
+    return StatsOut(bucket=bucket, series=results)
+
+
+@app.get("/correlations", dependencies=[Depends(verify_token)])
+def get_correlations(
+    max_lag: int = Query(3, ge=0, le=14),
+    min_exposed: int = Query(3, ge=1),
+    exposure: Optional[str] = None,
+    outcome: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=1000),
+) -> CorrelationsOut:
+    correlations.update(lambda day: events_index.between(day, day), diary_index.get)
+    results = [
+        r for r in correlations.results(max_lag, min_exposed)
+        if (not exposure or exposure in r["exposure"]) and (not outcome or outcome in r["outcome"])
+    ]
+    return CorrelationsOut(results=results[:limit])
 
 
 @app.post("/diary/parse-text", dependencies=[Depends(verify_token)])
-def parse_diary_text(body: DiaryParseIn) -> DiaryParseOut:
+async def parse_diary_text(body: DiaryParseIn) -> DiaryParseOut:
     if not OPENAI_API_KEY:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -214,9 +675,8 @@ def parse_diary_text(body: DiaryParseIn) -> DiaryParseOut:
         for q in body.questions
     )
 
-    client = OpenAI(api_key=OPENAI_API_KEY)
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
+    content = await _complete_cached(
+        [],
         response_format={"type": "json_object"},
         messages=[
             {
@@ -238,7 +698,7 @@ def parse_diary_text(body: DiaryParseIn) -> DiaryParseOut:
         ],
     )
 
-    parsed = json.loads(response.choices[0].message.content)
+    parsed = json.loads(content)
 
     # Only keep expected keys, coerce values to strings
     expected_keys = {q["key"] for q in body.questions}
@@ -254,18 +714,20 @@ def parse_diary_text(body: DiaryParseIn) -> DiaryParseOut:
     return DiaryParseOut(answers=answers)
 
 
-@app.get("/diary/{date}", dependencies=[Depends(verify_token)])
-def get_diary(date: str) -> DiaryOut:
-    if not DIARY_FILE.exists():
-        raise HTTPException(status_code=404, detail="No diary entry for this date")
+@app.get("/diary", dependencies=[Depends(verify_token)])
+def list_diary(
+    from_date: str = Query(..., alias="from"),
+    to_date: str = Query(..., alias="to"),
+) -> list[DiaryOut]:
+    results = [DiaryOut(**e) for e in diary_index.between(from_date, to_date)]
+    results.reverse()
+    return results
 
-    latest = None
-    for line in DIARY_FILE.read_text().strip().splitlines():
-        entry = json.loads(line)
-        if entry["date"] == date:
-            latest = entry
 
-    if not latest or latest.get("meta", {}).get("deleted"):
+@app.get("/diary/{date}", dependencies=[Depends(verify_token)])
+def get_diary(date: str) -> DiaryOut:
+    latest = diary_index.get(date)
+    if not latest:
         raise HTTPException(status_code=404, detail="No diary entry for this date")
 
     return DiaryOut(**latest)
@@ -283,10 +745,7 @@ def create_diary(diary: DiaryIn) -> DiaryOut:
         meta={"version": 1},
     )
 
-    DIARY_FILE.parent.mkdir(parents=True, exist_ok=True)
-
-    with open(DIARY_FILE, "a") as f:
-        f.write(json.dumps(stored.model_dump(), default=str) + "\n")
+    _append_diary(stored.model_dump(mode="json"))
 
     return stored
 
@@ -300,39 +759,39 @@ def delete_diary(date: str):
         "saved_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
         "meta": {"version": 1, "deleted": True},
     }
-    with open(DIARY_FILE, "a") as f:
-        f.write(json.dumps(deleted) + "\n")
+    _append_diary(deleted)
     return {"status": "deleted"}
 
 
+def _day_events(date: str) -> list[dict]:
+    # The day index also files updates and delete markers under the day the
+    # event originally lived on, so deduplicating these lines is enough.
+    by_id = {}
+    for entry in events_by_day.lines(date):
+        by_id[entry["id"]] = entry
+    return [e for e in by_id.values()
+            if not e.get("meta", {}).get("deleted")
+            and e.get("type") != "Diary"
+            and e.get("client_timestamp", "").startswith(date)]
+
+
 @app.get("/diary/{date}/summary", dependencies=[Depends(verify_token)])
-def get_diary_summary(date: str) -> DiarySummaryOut:
+async def get_diary_summary(date: str) -> DiarySummaryOut:
     if not OPENAI_API_KEY:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="OpenAI API key not configured",
         )
 
-    # Deduplicate by ID (latest version wins)
-    by_id = {}
-    if EVENTS_FILE.exists():
-        for line in EVENTS_FILE.read_text().strip().splitlines():
-            entry = json.loads(line)
-            if entry.get("type") == "Diary":
-                continue
-            ts = entry.get("client_timestamp", "")
-            if ts.startswith(date):
-                by_id[entry["id"]] = entry
-    events = [e for e in by_id.values() if not e.get("meta", {}).get("deleted")]
+    events = await run_in_threadpool(_day_events, date)
 
     if not events:
         return DiarySummaryOut(summary="No events logged for this date.")
 
     events_text = "\n".join(json.dumps(e) for e in events)
 
-    client = OpenAI(api_key=OPENAI_API_KEY)
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
+    summary = await _complete_cached(
+        [f"summary:{date}"],
         messages=[
             {
                 "role": "system",
@@ -349,7 +808,7 @@ def get_diary_summary(date: str) -> DiarySummaryOut:
         ],
     )
 
-    return DiarySummaryOut(summary=response.choices[0].message.content)
+    return DiarySummaryOut(summary=summary)
 
 
 @app.post("/reports", status_code=201, dependencies=[Depends(verify_token)])
@@ -363,30 +822,17 @@ def create_feedback(fb: FeedbackIn) -> FeedbackOut:
         created_at=created_at,
     )
 
-    FEEDBACK_FILE.parent.mkdir(parents=True, exist_ok=True)
-
-    with open(FEEDBACK_FILE, "a") as f:
-        f.write(json.dumps(stored.model_dump(), default=str) + "\n")
+    feedback_writer.append(stored.model_dump())
 
     return stored
 
 
 @app.get("/reports", dependencies=[Depends(verify_token)])
 def list_feedback() -> list[FeedbackOut]:
-    if not FEEDBACK_FILE.exists():
-        return []
-    results = []
-    for line in FEEDBACK_FILE.read_text().strip().splitlines():
-        if not line.strip():
-            continue
-        results.append(FeedbackOut(**json.loads(line)))
-    # Deduplicate by ID (latest wins), filter deleted
-    by_id = {}
-    for r in results:
-        by_id[r.id] = r
-    final = [f for f in by_id.values() if not f.meta.get("deleted")]
-    final.sort(key=lambda f: f.created_at, reverse=True)
-    return final
+    # The index deduplicates by ID (latest wins) and filters deleted reports
+    final = feedback_index.live(raw=True)
+    final.sort(key=lambda item: item[0]["created_at"], reverse=True)
+    return Response(json_array([raw for _, raw in final]), media_type="application/json")
 
 
 @app.delete("/reports/{feedback_id}", dependencies=[Depends(verify_token)])
@@ -398,8 +844,7 @@ def delete_feedback(feedback_id: str):
         "created_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
         "meta": {"version": 1, "deleted": True},
     }
-    with open(FEEDBACK_FILE, "a") as f:
-        f.write(json.dumps(deleted) + "\n")
+    feedback_writer.append(deleted)
     return {"status": "deleted"}
 
 
@@ -407,51 +852,50 @@ ALLOWED_MIME = {"image/jpeg", "image/png", "image/webp", "image/gif"}
 MAX_ATTACHMENT_BYTES = 10 * 1024 * 1024  # 10 MB
 
 
+ATTACHMENT_EXT = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/webp": ".webp",
+    "image/gif": ".gif",
+}
+
+
 @app.post("/reports/{report_id}/attachment", dependencies=[Depends(verify_token)])
-async def upload_attachment(report_id: str, file: UploadFile = File(...)):
-    if file.content_type not in ALLOWED_MIME:
-        raise HTTPException(status_code=400, detail="Only JPEG, PNG, WebP, and GIF images are allowed")
-
-    ext = {
-        "image/jpeg": ".jpg",
-        "image/png": ".png",
-        "image/webp": ".webp",
-        "image/gif": ".gif",
-    }[file.content_type]
-
-    data = await file.read()
-    if len(data) > MAX_ATTACHMENT_BYTES:
-        raise HTTPException(status_code=400, detail="File too large (max 10 MB)")
-
-    ATTACHMENTS_DIR.mkdir(parents=True, exist_ok=True)
-    filename = f"{report_id}{ext}"
-    dest = ATTACHMENTS_DIR / filename
-    dest.write_bytes(data)
-
-    # Append an updated record with the attachment field
-    # Read current record to preserve fields
-    current = None
-    if FEEDBACK_FILE.exists():
-        for line in FEEDBACK_FILE.read_text().strip().splitlines():
-            if not line.strip():
-                continue
-            entry = json.loads(line)
-            if entry["id"] == report_id:
-                current = entry
+async def upload_attachment(report_id: str, request: Request):
+    if not await run_in_threadpool(feedback_index.get, report_id):
+        raise HTTPException(status_code=404, detail="Report not found")
+
+    tmp, content_type = await receive_file(
+        request, "file", ATTACHMENTS_DIR, MAX_ATTACHMENT_BYTES, ALLOWED_MIME,
+    )
+    filename = f"{report_id}{ATTACHMENT_EXT[content_type]}"
+    os.replace(tmp, ATTACHMENTS_DIR / filename)
 
+    # Append an updated record with the attachment field, preserving the
+    # current fields of the report
+    current = await run_in_threadpool(feedback_index.get, report_id)
     if not current:
         raise HTTPException(status_code=404, detail="Report not found")
 
-    current["attachment"] = filename
-    with open(FEEDBACK_FILE, "a") as f:
-        f.write(json.dumps(current) + "\n")
+    current = {**current, "attachment": filename}
+    await run_in_threadpool(feedback_writer.append, current)
 
     return {"attachment": filename}
 
 
 @app.get("/attachments/{filename}")
-def serve_attachment(filename: str):
+def serve_attachment(filename: str, request: Request):
     path = ATTACHMENTS_DIR / filename
-    if not path.exists():
+    if not path.is_file():
         raise HTTPException(status_code=404, detail="Attachment not found")
-    return FileResponse(path)
+    if ATTACHMENTS_ACCEL:
+        # nginx streams the file itself, including Range and conditional requests
+        return Response(headers={"X-Accel-Redirect": ATTACHMENTS_ACCEL + filename})
+
+    response = FileResponse(path, stat_result=path.stat())
+    if request.headers.get("if-none-match") == response.headers["etag"]:
+        return Response(status_code=304, headers={
+            "ETag": response.headers["etag"],
+            "Last-Modified": response.headers["last-modified"],
+        })
+    return response
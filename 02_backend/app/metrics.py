@@ -0,0 +1,288 @@
+import sys
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+# Seconds; covers fast index reads up to slow LLM calls
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# The ASGI scope of the request being handled, if any. Copied into the
+# threadpool with the rest of the context, so sync handlers see it too.
+_request: ContextVar[Optional[dict]] = ContextVar("huxa_request", default=None)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._lock = threading.Lock()
+
+    def samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        return "\n".join(lines + self.samples())
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        super().__init__(name, help, labels)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, value: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + value
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labels, k)} {_number(v)}" for k, v in values]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = buckets
+        # labels -> [count per bucket..., sum, count]
+        self._values: dict[tuple[str, ...], list[float]] = {}
+
+    def observe(self, value: float, *labels: str):
+        with self._lock:
+            row = self._values.get(labels)
+            if row is None:
+                row = self._values[labels] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+                    break
+            row[-2] += value
+            row[-1] += 1
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            values = sorted((k, list(v)) for k, v in self._values.items())
+        lines = []
+        for labels, row in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets, row):
+                cumulative += count
+                le = _labels(self.labels, labels, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            le = _labels(self.labels, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {row[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, labels)} {_number(row[-2])}")
+            lines.append(f"{self.name}_count{_labels(self.labels, labels)} {row[-1]}")
+        return lines
+
+
+class Gauge(Metric):
+    """A value read at scrape time: ``read`` returns ``{label values: value}``."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (),
+                 read: Callable[[], dict[tuple[str, ...], float]] = dict):
+        super().__init__(name, help, labels)
+        self.read = read
+
+    def samples(self) -> list[str]:
+        return [f"{self.name}{_labels(self.labels, k)} {_number(v)}" for k, v in sorted(self.read().items())]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        return "\n".join(m.render() for m in self._metrics.values()) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "huxa_http_requests_total", "HTTP requests by route template and status.", ("method", "route", "status")))
+HTTP_SECONDS = REGISTRY.register(Histogram(
+    "huxa_http_request_duration_seconds", "Time to the end of the response body.", ("method", "route")))
+JSONL_READ_BYTES = REGISTRY.register(Counter(
+    "huxa_jsonl_read_bytes_total", "Bytes read from JSONL files, by the route that caused the read.",
+    ("route", "file")))
+JSONL_LINES = REGISTRY.register(Counter(
+    "huxa_jsonl_lines_parsed_total", "JSONL lines parsed, by the route that caused the read.", ("route", "file")))
+LLM_SECONDS = REGISTRY.register(Histogram(
+    "huxa_llm_request_duration_seconds", "OpenAI chat completion latency, retries included.", ("route",)))
+LLM_TOKENS = REGISTRY.register(Counter(
+    "huxa_llm_tokens_total", "OpenAI token usage by kind (prompt or completion).", ("route", "kind")))
+LLM_ERRORS = REGISTRY.register(Counter(
+    "huxa_llm_errors_total", "Failed OpenAI calls by exception type (LLMBusy when rejected).", ("route", "error")))
+APPEND_LINES = REGISTRY.register(Counter(
+    "huxa_append_lines_total", "Lines appended to each JSONL file.", ("file",)))
+APPEND_BYTES = REGISTRY.register(Counter(
+    "huxa_append_bytes_total", "Bytes appended to each JSONL file.", ("file",)))
+APPEND_SECONDS = REGISTRY.register(Histogram(
+    "huxa_append_batch_duration_seconds", "Time to write (and fsync) one group-commit batch.", ("file",)))
+
+
+def _route(scope: dict) -> str:
+    # Unmatched paths share one label so scanners can't blow up cardinality
+    return getattr(scope.get("route"), "path", "unmatched")
+
+
+def current_route() -> str:
+    """Route template of the request being handled; ``background`` outside requests."""
+    scope = _request.get()
+    return "background" if scope is None else _route(scope)
+
+
+def record_read(path: Path, nbytes: int, lines: int):
+    route = current_route()
+    JSONL_READ_BYTES.inc(route, path.name, value=nbytes)
+    JSONL_LINES.inc(route, path.name, value=lines)
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request by route template.
+
+    The duration runs until the last body chunk is sent, so streamed
+    responses count in full. With a ``profiler``, requests slower than its
+    threshold get a profile written (except Server-Sent Events streams,
+    which are long by design).
+    """
+
+    def __init__(self, app, profiler: Optional["SlowRequestProfiler"] = None):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+        event_stream = False
+
+        async def send_status(message):
+            nonlocal status, event_stream
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                event_stream = any(k == b"content-type" and v.startswith(b"text/event-stream")
+                                   for k, v in message.get("headers", []))
+            await send(message)
+
+        token = _request.set(scope)
+        start = time.perf_counter()
+        if self.profiler:
+            self.profiler.start()
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            end = time.perf_counter()
+            _request.reset(token)
+            route = _route(scope)
+            HTTP_REQUESTS.inc(scope["method"], route, str(status))
+            HTTP_SECONDS.observe(end - start, scope["method"], route)
+            if self.profiler and end - start >= self.profiler.threshold and not event_stream:
+                await run_in_threadpool(self.profiler.dump, f"{scope['method']} {route}", start, end)
+
+
+# Leaf frames of threads that are waiting, not working
+IDLE = {("threading.py", "wait"), ("selectors.py", "select"), ("queue.py", "get"), ("thread.py", "_worker")}
+
+
+class SlowRequestProfiler:
+    """Sampling profiler that keeps stacks of slow requests.
+
+    A background thread samples the Python stack of every thread each
+    ``interval`` seconds and keeps the last ``window`` seconds of samples.
+    When a request took at least ``threshold`` seconds, the samples taken
+    during it are written to ``directory`` in the collapsed-stack format
+    (one ``thread;frame;...;frame count`` line per stack) that flamegraph.pl
+    and speedscope read. Samples cover every thread, so concurrent requests
+    show up too; idle threads are left out. Only the newest ``keep``
+    profiles are kept.
+    """
+
+    def __init__(self, directory: Path, threshold: float, interval: float = 0.005,
+                 window: float = 120.0, keep: int = 50):
+        self.directory = directory
+        self.threshold = threshold
+        self.interval = interval
+        self.keep = keep
+        self._samples: deque = deque(maxlen=int(window / interval))
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        me = threading.get_ident()
+        while True:
+            now = time.perf_counter()
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                codes = []
+                while frame is not None:
+                    codes.append(frame.f_code)
+                    frame = frame.f_back
+                if codes and (Path(codes[0].co_filename).name, codes[0].co_name) not in IDLE:
+                    self._samples.append((now, names.get(ident, str(ident)), tuple(reversed(codes))))
+            time.sleep(self.interval)
+
+    def dump(self, label: str, start: float, end: float) -> Optional[Path]:
+        """Write the samples taken between ``start`` and ``end`` (``perf_counter`` times)."""
+        stacks: dict[str, int] = {}
+        for t, thread, codes in list(self._samples):
+            if start <= t <= end:
+                frames = [thread] + [f"{c.co_name} ({Path(c.co_filename).name}:{c.co_firstlineno})" for c in codes]
+                line = ";".join(frames)
+                stacks[line] = stacks.get(line, 0) + 1
+        if not stacks:
+            return None
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S.%fZ")
+        slug = "".join(c if c.isalnum() else "_" for c in label).strip("_")
+        path = self.directory / f"{stamp}-{slug}-{(end - start) * 1000:.0f}ms.folded"
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path.write_text("".join(f"{line} {count}\n" for line, count in sorted(stacks.items())))
+        for old in sorted(self.directory.glob("*.folded"))[:-self.keep]:
+            old.unlink(missing_ok=True)
+        return path
@@ -1,7 +1,7 @@
 from enum import Enum
 from typing import Any
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class EventType(str, Enum):
@@ -29,14 +29,78 @@ class EventStored(EventIn):
     received_at: str = Field(..., description="ISO 8601 UTC timestamp with Z, set by server")
 
 
+class EventBatchResult(BaseModel):
+    index: int = Field(..., description="Position of the record in the request body")
+    id: str | None = None
+    status: str = Field(..., description="created, duplicate, deleted or invalid")
+    error: str | None = None
+
+
+class EventBatchOut(BaseModel):
+    results: list[EventBatchResult]
+
+
+class EventChangesOut(BaseModel):
+    changes: list[dict[str, Any]] = Field(..., description="Raw log records, updates and delete markers included")
+    cursor: str = Field(..., description="Pass as `since` to get the records appended after these")
+    more: bool = Field(..., description="True if the limit cut the response short")
+
+
 class QueryIn(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
     question: str
+    from_date: str | None = Field(None, alias="from", description="YYYY-MM-DD, inclusive")
+    to_date: str | None = Field(None, alias="to", description="YYYY-MM-DD, inclusive")
+    types: list[EventType] | None = Field(None, description="Only include events of these types")
 
 
 class QueryOut(BaseModel):
     answer: str
 
 
+class SearchHit(BaseModel):
+    source: str = Field(..., description="event or diary")
+    id: str = Field(..., description="Event id, or the date of a diary entry")
+    date: str
+    score: float
+    snippet: str
+
+
+class SearchOut(BaseModel):
+    results: list[SearchHit]
+
+
+class StatsSeries(BaseModel):
+    name: str = Field(..., description="count.<Type>, metric.<name> or diary.<question>")
+    start: list[str] = Field(..., description="First day of each bucket")
+    mean: list[float]
+    min: list[float]
+    max: list[float]
+    sum: list[float]
+    count: list[int] = Field(..., description="Number of values in each bucket")
+    days: list[int] = Field(..., description="Number of days with values in each bucket")
+
+
+class StatsOut(BaseModel):
+    bucket: str
+    series: list[StatsSeries]
+
+
+class Correlation(BaseModel):
+    exposure: str = Field(..., description="intervention:<word>")
+    outcome: str = Field(..., description="symptom:<word> or diary:<question>")
+    lag: int = Field(..., description="Days between exposure and outcome")
+    r: float = Field(..., description="Pearson correlation")
+    effect: float = Field(..., description="Mean outcome after exposure minus mean after none")
+    n: int = Field(..., description="Days compared")
+    exposed: int = Field(..., description="Days compared that had the exposure")
+
+
+class CorrelationsOut(BaseModel):
+    results: list[Correlation]
+
+
 class DiaryMeta(BaseModel):
     version: int = 1
 
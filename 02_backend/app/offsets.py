@@ -0,0 +1,135 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Optional
+
+from app.index import SNAPSHOT_EVERY, fingerprint
+from app.jsonl import read_from, read_lines
+from app.segments import log_stat
+
+
+class DayOffsetIndex:
+    """Sidecar index mapping each day to the byte offsets of the lines that affect it.
+
+    The sidecar lives under ``derived/`` and records the size, inode, mtime
+    and a fingerprint of the last bytes of the source file it describes. If
+    the source has grown since, only the new lines are indexed; if it shrank,
+    was replaced or was rewritten, the sidecar is rebuilt from the raw stream.
+
+    The sidecar is rewritten every ``SNAPSHOT_EVERY`` indexed lines and on
+    ``checkpoint``, not on every append: the lines after the saved size are
+    simply indexed again on the next start.
+
+    ``day`` extracts the day a line belongs to. When ``ident`` is given, a
+    line is also filed under the day its record previously lived on, so that
+    updates and delete markers (which carry their own timestamp) are found
+    when reading the original day.
+    """
+
+    def __init__(
+        self,
+        source: Path,
+        sidecar: Path,
+        day: Callable[[dict], str],
+        ident: Optional[Callable[[dict], str]] = None,
+    ):
+        self.source = source
+        self.sidecar = sidecar
+        self.day = day
+        self.ident = ident
+        self._lock = threading.Lock()
+        self._state = None
+        self._since_save = 0
+
+    def _empty(self) -> dict:
+        return {"size": 0, "inode": None, "mtime_ns": 0, "fingerprint": None, "days": {}, "last_day": {}}
+
+    def _load(self) -> dict:
+        try:
+            return json.loads(self.sidecar.read_text())
+        except (FileNotFoundError, ValueError):
+            return self._empty()
+
+    def _save(self):
+        self.sidecar.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.sidecar.with_name(f"{self.sidecar.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(self._state, separators=(",", ":")))
+        os.replace(tmp, self.sidecar)
+        self._since_save = 0
+
+    def _add(self, offset: int, entry: dict):
+        days = self._state["days"]
+        day = self.day(entry)
+        filed = {day}
+        if self.ident:
+            key = self.ident(entry)
+            previous = self._state["last_day"].get(key)
+            if previous is not None:
+                filed.add(previous)
+            self._state["last_day"][key] = day
+        for d in filed:
+            days.setdefault(d, []).append(offset)
+
+    def _refresh(self):
+        if self._state is None:
+            self._state = self._load()
+
+        try:
+            st = log_stat(self.source)
+        except FileNotFoundError:
+            self._state = self._empty()
+            return
+
+        size = self._state["size"]
+        if size == 0:
+            consistent = True
+        elif self._state.get("inode") != st.inode or size > st.size:
+            consistent = False
+        elif size == st.size:
+            consistent = self._state["mtime_ns"] == st.mtime_ns
+        else:
+            # Grown: the bytes already indexed must still be the same
+            consistent = self._state.get("fingerprint") == fingerprint(self.source, size)
+        if not consistent:
+            self._state = self._empty()
+            self._since_save = 0
+        elif size == st.size:
+            return
+
+        entries, end = read_from(self.source, self._state["size"])
+        for offset, entry in entries:
+            self._add(offset, entry)
+        self._state["size"] = end
+        self._state["inode"] = st.inode
+        self._state["mtime_ns"] = st.mtime_ns if end == st.size else 0
+        self._state["fingerprint"] = fingerprint(self.source, end)
+        self._since_save += len(entries)
+        if self._since_save >= SNAPSHOT_EVERY or not consistent:
+            self._save()
+
+    def refresh(self):
+        """Bring the sidecar up to date with the source file."""
+        with self._lock:
+            self._refresh()
+
+    def checkpoint(self):
+        """Write the sidecar now if lines were indexed since it was last saved."""
+        with self._lock:
+            if self._since_save:
+                self._save()
+
+    def rebuild(self):
+        """Discard the sidecar and re-index the whole source file."""
+        with self._lock:
+            self._state = self._empty()
+            self._refresh()
+
+    def lines(self, day: str) -> list[dict]:
+        """Parsed lines filed under ``day``, in file order."""
+        with self._lock:
+            self._refresh()
+            offsets = list(self._state["days"].get(day, []))
+        if not offsets:
+            return []
+        return read_lines(self.source, offsets)
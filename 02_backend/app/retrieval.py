@@ -0,0 +1,280 @@
+import argparse
+import fcntl
+import json
+import os
+import re
+import threading
+import zlib
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from app.index import fingerprint
+from app.jsonl import is_deleted, read_from
+from app.segments import log_stat
+
+
+class HashingEmbedder:
+    """Fully local embedder: hashed word and character n-gram counts, projected to ``dim``.
+
+    Each feature is hashed to a signed bucket, counts are log-scaled and the
+    vector is L2-normalized, so cosine similarity is a dot product. It needs
+    no model download or network access and is deterministic across runs.
+    """
+
+    name = "hashing"
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+
+    def _features(self, text: str) -> list[str]:
+        words = re.findall(r"[a-z0-9]+", text.lower())
+        features = [f"w:{w}" for w in words]
+        features += [f"b:{a}_{b}" for a, b in zip(words, words[1:])]
+        for w in words:
+            padded = f"<{w}>"
+            features += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+        return features
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                h = zlib.crc32(feature.encode())
+                out[row, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        out = np.sign(out) * np.log1p(np.abs(out))
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return out / norms
+
+
+EMBEDDERS = {"hashing": HashingEmbedder}
+
+
+def get_embedder(name: str):
+    try:
+        return EMBEDDERS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown embedder {name!r}, expected one of {sorted(EMBEDDERS)}") from None
+
+
+def event_key(e: dict) -> str:
+    return f"event:{e['id']}"
+
+
+def diary_key(d: dict) -> str:
+    return f"diary:{d['date']}"
+
+
+def event_text(e: dict) -> str:
+    metrics = " ".join(f"{k} {v}" for k, v in e.get("metrics", {}).items())
+    return f"{e.get('type', '')} {e.get('text', '')} {metrics}"
+
+
+def diary_text(d: dict) -> str:
+    return " ".join(f"{k} {v}" for k, v in d.get("answers", {}).items() if v not in ("", None))
+
+
+# Log name -> (row key, embedded text) of its records
+SOURCES = {"events": (event_key, event_text), "diary": (diary_key, diary_text)}
+EMBED_BATCH = 1000
+
+
+class VectorStore:
+    """Append-only float32 matrix of embeddings with an id map, under ``directory``.
+
+    ``vectors.f32`` holds one row per embedded record and ``vectors.ids.jsonl``
+    the key of each row, in the same order. Later rows for a key supersede
+    earlier ones; a delete marker gets a zero row flagged ``deleted``.
+
+    Like the other derived indexes, the store tails events.jsonl and
+    diary.jsonl: ``vectors.state.json`` records the embedder and how far into
+    each log it has embedded, and ``refresh`` embeds only the lines appended
+    since, whichever process wrote them. If a log was rewritten or the
+    embedder changed, the store starts over. The matrix is memory-mapped for
+    search and re-mapped when it grows.
+    """
+
+    def __init__(self, directory: Path, embedder, events: Path, diary: Path):
+        self.directory = directory
+        self.embedder = embedder
+        self.dim = embedder.dim
+        self.sources = {"events": events, "diary": diary}
+        self._lock = threading.Lock()
+        self._reset(None)
+
+    def _reset(self, inode):
+        self._inode = inode
+        self._keys: list[str] = []
+        self._latest: dict[str, int] = {}
+        self._ids_offset = 0
+        self._matrix = None
+
+    @property
+    def vectors_path(self) -> Path:
+        return self.directory / "vectors.f32"
+
+    @property
+    def ids_path(self) -> Path:
+        return self.directory / "vectors.ids.jsonl"
+
+    @property
+    def state_path(self) -> Path:
+        return self.directory / "vectors.state.json"
+
+    def _empty(self) -> dict:
+        return {
+            "embedder": self.embedder.name,
+            "dim": self.dim,
+            "sources": {name: {"offset": 0, "fingerprint": ""} for name in self.sources},
+        }
+
+    def _clear(self) -> dict:
+        for path in (self.state_path, self.ids_path, self.vectors_path):
+            path.unlink(missing_ok=True)
+        self._reset(None)
+        return self._empty()
+
+    def _save(self, state: dict):
+        tmp = self.state_path.with_name(f"{self.state_path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(state, separators=(",", ":")))
+        os.replace(tmp, self.state_path)
+
+    def _catch_up(self):
+        """Embed the log lines appended since the saved state; the caller holds the store's flock."""
+        try:
+            state = json.loads(self.state_path.read_text())
+        except (FileNotFoundError, ValueError):
+            state = None
+        if state is None or state.get("embedder") != self.embedder.name or state.get("dim") != self.dim:
+            state = self._clear()
+
+        records: list[tuple[str, Optional[str]]] = []
+        for name, path in self.sources.items():
+            source = state["sources"][name]
+            try:
+                size = log_stat(path).size
+            except FileNotFoundError:
+                size = 0
+            offset = source["offset"]
+            if offset > size or (offset and source["fingerprint"] != fingerprint(path, offset)):
+                # The log was rewritten — start over
+                self._clear()
+                return self._catch_up()
+            if size == offset:
+                continue
+            entries, offset = read_from(path, offset)
+            key, text = SOURCES[name]
+            records += [(key(e), None if is_deleted(e) else text(e)) for _, e in entries]
+            source["offset"] = offset
+            source["fingerprint"] = fingerprint(path, offset)
+        if not records:
+            return
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._refresh()
+        with open(self.ids_path, "ab") as ids, open(self.vectors_path, "ab") as vecs:
+            # Drop rows written without their ids by an interrupted catch-up,
+            # so rows and ids stay aligned
+            vecs.truncate(len(self._keys) * 4 * self.dim)
+            for start in range(0, len(records), EMBED_BATCH):
+                batch = records[start:start + EMBED_BATCH]
+                vectors = np.zeros((len(batch), self.dim), dtype=np.float32)
+                live = [i for i, (_, text) in enumerate(batch) if text is not None]
+                if live:
+                    vectors[live] = self.embedder.embed([batch[i][1] for i in live])
+                # Vectors first, so a reader never sees an id without its row
+                vecs.write(vectors.tobytes())
+                vecs.flush()
+                ids.write("".join(
+                    json.dumps({"key": k} if text is not None else {"key": k, "deleted": True}) + "\n"
+                    for k, text in batch
+                ).encode())
+                ids.flush()
+        self._save(state)
+
+    def _refresh(self):
+        try:
+            st = self.ids_path.stat()
+        except FileNotFoundError:
+            self._reset(None)
+            return
+        # A fresh start swaps in new files — start over
+        if st.st_ino != self._inode:
+            self._reset(st.st_ino)
+        if st.st_size > self._ids_offset:
+            entries, self._ids_offset = read_from(self.ids_path, self._ids_offset)
+            for _, entry in entries:
+                if entry.get("deleted"):
+                    self._latest.pop(entry["key"], None)
+                else:
+                    self._latest[entry["key"]] = len(self._keys)
+                self._keys.append(entry["key"])
+        rows = min(len(self._keys), self.vectors_path.stat().st_size // (4 * self.dim))
+        if self._matrix is None or self._matrix.shape[0] != rows:
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim)) if rows else None
+
+    def _update(self, rebuild: bool):
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            # One process embeds at a time; the others then see its rows
+            with open(self.directory / "vectors.lock", "wb") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                try:
+                    if rebuild:
+                        self._clear()
+                    self._catch_up()
+                finally:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+            self._refresh()
+
+    def refresh(self):
+        """Embed whatever was appended to the logs since the last refresh."""
+        self._update(rebuild=False)
+
+    def rebuild(self):
+        """Discard the store and re-embed both logs from the start."""
+        self._update(rebuild=True)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._latest)
+
+    def search(self, text: str, k: int = 200) -> list[tuple[str, float]]:
+        """Top ``k`` live keys by cosine similarity to ``text``, best first (positive scores only)."""
+        query = self.embedder.embed([text])[0]
+        self.refresh()
+        with self._lock:
+            if self._matrix is None:
+                return []
+            n = self._matrix.shape[0]
+            rows = np.fromiter((row for row in self._latest.values() if row < n), dtype=np.int64)
+            # One pass over the mapped matrix, no per-query copy of the rows;
+            # superseded and deleted rows are masked out afterwards
+            scores = np.full(n, -np.inf, dtype=np.float32)
+            scores[rows] = (self._matrix @ query)[rows]
+            keys = self._keys
+        if not len(rows):
+            return []
+        top = np.argpartition(-scores, min(k, n) - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(keys[i], float(scores[i])) for i in top if scores[i] > 0]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bring the vector index up to date with events.jsonl and diary.jsonl")
+    parser.add_argument("--events", default=os.environ.get("HUXA_EVENTS_FILE", "/var/lib/huxa/events.jsonl"))
+    parser.add_argument("--diary", default=os.environ.get("HUXA_DIARY_FILE", "/var/lib/huxa/diary.jsonl"))
+    parser.add_argument("--derived", default=os.environ.get("HUXA_DERIVED_DIR", "/var/lib/huxa/derived"))
+    parser.add_argument("--embedder", default=os.environ.get("HUXA_EMBEDDER", "hashing"))
+    parser.add_argument("--rebuild", action="store_true", help="Discard the store and re-embed everything")
+    args = parser.parse_args()
+
+    store = VectorStore(Path(args.derived) / "vectors", get_embedder(args.embedder), Path(args.events), Path(args.diary))
+    if args.rebuild:
+        store.rebuild()
+    else:
+        store.refresh()
+    print(f"{len(store)} records embedded")
@@ -0,0 +1,159 @@
+import re
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+
+from app.index import TailIndex
+from app.jsonl import is_deleted
+
+BUCKETS = ("day", "week", "month")
+DATE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+def _numeric(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def event_values(e: dict) -> tuple[str, str, dict[str, float]]:
+    """(key, date, series values) for an event: its type count and numeric metrics."""
+    values = {f"count.{e.get('type', '')}": 1.0}
+    values.update({f"metric.{k}": float(v) for k, v in e.get("metrics", {}).items() if _numeric(v)})
+    return e["id"], e.get("client_timestamp", "")[:10], values
+
+
+def diary_values(d: dict) -> tuple[str, str, dict[str, float]]:
+    """(key, date, series values) for a diary entry: its numeric answers, e.g. 1-10 scales."""
+    return d["date"], d["date"], {f"diary.{k}": float(v) for k, v in d.get("answers", {}).items() if _numeric(v)}
+
+
+class SeriesIndex(TailIndex):
+    """Per-day rollups of the numeric series found in one JSONL store.
+
+    ``values`` maps a stored record to ``(key, date, {series: value})``. Only
+    the latest live version of each record counts. For every series the
+    daily sum, count, min and max are kept, and only the days touched by new
+    lines are recomputed. ``columns`` returns them as NumPy arrays, cached
+    until the series changes again.
+    """
+
+    def __init__(self, path: Path, values: Callable[[dict], tuple[str, str, dict[str, float]]],
+                 snapshot: Optional[Path] = None):
+        self.values = values
+        super().__init__(path, snapshot)
+
+    def _clear(self):
+        # key -> [date, {series: value}] for the latest live version of each record
+        self._records: dict[str, list] = {}
+        # (series, date) -> {key: value}
+        self._cells: dict[tuple[str, str], dict[str, float]] = {}
+        # series -> {date: (sum, count, min, max)}
+        self._daily: dict[str, dict[str, tuple[float, int, float, float]]] = {}
+        self._arrays: dict[str, dict[str, np.ndarray]] = {}
+        self._dirty: set[tuple[str, str]] = set()
+
+    def _state(self) -> dict:
+        # Records are replaced, never changed in place
+        return {"records": dict(self._records)}
+
+    def _restore(self, state: dict):
+        for key, (date, values) in state["records"].items():
+            self._set(key, date, values)
+        self._rollup()
+
+    def _set(self, key: str, date: Optional[str], values: dict[str, float]):
+        old = self._records.pop(key, None)
+        if old is not None:
+            for series in old[1]:
+                self._cells[(series, old[0])].pop(key, None)
+                self._dirty.add((series, old[0]))
+        if date is not None and values:
+            self._records[key] = [date, values]
+            for series, value in values.items():
+                self._cells.setdefault((series, date), {})[key] = value
+                self._dirty.add((series, date))
+
+    def _apply(self, entry: dict):
+        key, date, values = self.values(entry)
+        self._set(key, None if is_deleted(entry) or not DATE.match(date) else date, values)
+
+    def _applied(self, count: int):
+        self._rollup()
+        super()._applied(count)
+
+    def _rollup(self):
+        """Recompute the daily aggregates of every (series, day) touched since the last call."""
+        for series, date in self._dirty:
+            daily = self._daily.setdefault(series, {})
+            cell = self._cells.get((series, date))
+            if cell:
+                values = list(cell.values())
+                daily[date] = (sum(values), len(values), min(values), max(values))
+            else:
+                self._cells.pop((series, date), None)
+                daily.pop(date, None)
+                if not daily:
+                    del self._daily[series]
+            self._arrays.pop(series, None)
+        self._dirty.clear()
+
+    def series(self) -> list[str]:
+        with self._lock:
+            self._refresh()
+            return sorted(self._daily)
+
+    def columns(self, series: str) -> Optional[dict[str, np.ndarray]]:
+        """Daily ``date``, ``sum``, ``count``, ``min`` and ``max`` arrays for ``series``, oldest first."""
+        with self._lock:
+            self._refresh()
+            if series not in self._daily:
+                return None
+            if series not in self._arrays:
+                dates = sorted(self._daily[series])
+                rows = np.array([self._daily[series][d] for d in dates], dtype=np.float64).reshape(-1, 4)
+                self._arrays[series] = {
+                    "date": np.array(dates, dtype="datetime64[D]"),
+                    "sum": rows[:, 0],
+                    "count": rows[:, 1],
+                    "min": rows[:, 2],
+                    "max": rows[:, 3],
+                }
+            return self._arrays[series]
+
+
+def _bucket_starts(dates: np.ndarray, bucket: str) -> np.ndarray:
+    if bucket == "month":
+        return dates.astype("datetime64[M]").astype("datetime64[D]")
+    if bucket == "week":
+        # datetime64 weeks start on Thursday (the epoch); shift to ISO Mondays
+        return (dates + 3).astype("datetime64[W]").astype("datetime64[D]") - 3
+    return dates
+
+
+def rollup(columns: dict[str, np.ndarray], from_date: str, to_date: str, bucket: str) -> dict[str, list]:
+    """Aggregate daily columns into day/week/month buckets within ``[from_date, to_date]``.
+
+    ``mean`` is over all values in the bucket, ``count`` is the number of
+    values and ``days`` the number of days that had any.
+    """
+    dates = columns["date"]
+    lo = np.searchsorted(dates, np.datetime64(from_date, "D"), side="left")
+    hi = np.searchsorted(dates, np.datetime64(to_date, "D"), side="right")
+    dates = dates[lo:hi]
+    if not len(dates):
+        return {"start": [], "mean": [], "min": [], "max": [], "sum": [], "count": [], "days": []}
+
+    starts = _bucket_starts(dates, bucket)
+    # Dates are sorted, so each bucket is a contiguous run
+    edges = np.flatnonzero(np.r_[True, starts[1:] != starts[:-1]])
+    sums = np.add.reduceat(columns["sum"][lo:hi], edges)
+    counts = np.add.reduceat(columns["count"][lo:hi], edges)
+    return {
+        "start": starts[edges].astype(str).tolist(),
+        "mean": np.round(sums / counts, 4).tolist(),
+        "min": np.minimum.reduceat(columns["min"][lo:hi], edges).tolist(),
+        "max": np.maximum.reduceat(columns["max"][lo:hi], edges).tolist(),
+        "sum": sums.tolist(),
+        "count": counts.astype(int).tolist(),
+        "days": np.diff(np.r_[edges, len(dates)]).tolist(),
+    }
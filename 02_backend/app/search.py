@@ -0,0 +1,163 @@
+import math
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Optional
+
+from app.context import STOPWORDS
+from app.index import TailIndex
+from app.jsonl import is_deleted
+
+# BM25 parameters (the usual defaults)
+K1 = 1.2
+B = 0.75
+SNIPPET_CHARS = 160
+
+
+def tokens(text: str) -> list[str]:
+    return [w for w in re.findall(r"[a-z0-9]+", text.lower()) if w not in STOPWORDS]
+
+
+def event_doc(e: dict) -> tuple[str, str, str]:
+    """(key, date, searchable text) for an event."""
+    return e["id"], e.get("client_timestamp", "")[:10], e.get("text", "")
+
+
+def diary_doc(d: dict) -> tuple[str, str, str]:
+    """(key, date, searchable text) for a diary entry: its non-empty answers."""
+    answers = "; ".join(f"{k}: {v}" for k, v in d.get("answers", {}).items() if v not in ("", None))
+    return d["date"], d["date"], answers
+
+
+class TextIndex(TailIndex):
+    """Inverted index over one JSONL store: postings lists of term counts per token.
+
+    ``doc`` maps a stored record to ``(key, date, text)``. A later record
+    with the same key replaces the earlier document and a delete marker
+    removes it, so only the latest live version of each record is
+    searchable. The snapshot holds the documents and postings, so a cold
+    start does not re-tokenize the whole log.
+    """
+
+    def __init__(self, path: Path, doc: Callable[[dict], tuple[str, str, str]], snapshot: Optional[Path] = None):
+        self.doc = doc
+        super().__init__(path, snapshot)
+
+    def _clear(self):
+        # key -> [date, text, length in tokens]
+        self._docs: dict[str, list] = {}
+        # token -> {key: term count}
+        self._postings: dict[str, dict[str, int]] = {}
+        self._length = 0
+
+    def _state(self) -> dict:
+        # Documents are replaced, never changed in place; postings lists are
+        return {"docs": dict(self._docs), "postings": {token: dict(p) for token, p in self._postings.items()}}
+
+    def _restore(self, state: dict):
+        self._docs = state["docs"]
+        self._postings = state["postings"]
+        self._length = sum(length for _, _, length in self._docs.values())
+
+    def _remove(self, key: str):
+        old = self._docs.pop(key, None)
+        if old is None:
+            return
+        self._length -= old[2]
+        for token in set(tokens(old[1])):
+            postings = self._postings[token]
+            del postings[key]
+            if not postings:
+                del self._postings[token]
+
+    def _apply(self, entry: dict):
+        key, date, text = self.doc(entry)
+        if not isinstance(date, str):
+            raise TypeError("date must be a string")
+        self._remove(key)
+        if is_deleted(entry):
+            return
+        counts = Counter(tokens(text))
+        if not counts:
+            return
+        self._docs[key] = [date, text, sum(counts.values())]
+        self._length += self._docs[key][2]
+        for token, count in counts.items():
+            self._postings.setdefault(token, {})[key] = count
+
+    def stats(self, words: set[str]) -> tuple[int, int, dict[str, int]]:
+        """Document count, total length in tokens and document frequency of each of ``words``."""
+        with self._lock:
+            self._refresh()
+            return len(self._docs), self._length, {w: len(self._postings.get(w, ())) for w in words}
+
+    def score(self, idf: dict[str, float], avgdl: float, from_date: str, to_date: str) -> list[tuple[str, str, str, float]]:
+        """BM25 ``(key, date, text, score)`` of every document dated in range that has a term of ``idf``."""
+        scores: dict[str, float] = {}
+        with self._lock:
+            self._refresh()
+            for word, weight in idf.items():
+                for key, tf in self._postings.get(word, {}).items():
+                    date, _, length = self._docs[key]
+                    if from_date <= date <= to_date:
+                        norm = tf + K1 * (1 - B + B * length / avgdl)
+                        scores[key] = scores.get(key, 0.0) + weight * tf * (K1 + 1) / norm
+            return [(key, self._docs[key][0], self._docs[key][1], score) for key, score in scores.items()]
+
+
+def _snippet(text: str, words: set[str]) -> str:
+    """Window of ``text`` around the first query term, with ellipses where cut."""
+    match = next((m for m in re.finditer(r"[a-z0-9]+", text.lower()) if m.group() in words), None)
+    start = 0 if match is None else max(0, match.start() - SNIPPET_CHARS // 3)
+    end = start + SNIPPET_CHARS
+    snippet = text[start:end].strip()
+    return ("…" if start > 0 else "") + snippet + ("…" if end < len(text) else "")
+
+
+class SearchIndex:
+    """BM25 full-text search over event text and diary answers.
+
+    Each store has its own ``TextIndex``; document counts, lengths and
+    document frequencies are combined so scores are comparable across them.
+    """
+
+    def __init__(self, events: TextIndex, diary: TextIndex):
+        self.sources = {"event": events, "diary": diary}
+
+    def refresh(self):
+        for index in self.sources.values():
+            index.refresh()
+
+    def search(self, query: str, from_date: str = "", to_date: str = "9999-12-31",
+               sort: str = "relevance", limit: int = 20) -> list[dict]:
+        """Best matches for ``query`` dated within ``[from_date, to_date]``.
+
+        ``sort="recent"`` orders matches newest first instead of by score.
+        """
+        words = set(tokens(query))
+        if not words:
+            return []
+        stats = [index.stats(words) for index in self.sources.values()]
+        n = sum(docs for docs, _, _ in stats)
+        if not n:
+            return []
+        avgdl = sum(length for _, length, _ in stats) / n
+        idf = {}
+        for word in words:
+            df = sum(freq[word] for _, _, freq in stats)
+            if df:
+                idf[word] = math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+        hits = [
+            (date, score, source, key, text)
+            for source, index in self.sources.items()
+            for key, date, text, score in index.score(idf, avgdl, from_date, to_date)
+        ]
+        if sort == "recent":
+            hits.sort(key=lambda h: (h[0], h[1]), reverse=True)
+        else:
+            hits.sort(key=lambda h: (h[1], h[0]), reverse=True)
+        return [
+            {"source": source, "id": key, "date": date, "score": round(score, 4), "snippet": _snippet(text, words)}
+            for date, score, source, key, text in hits[:limit]
+        ]
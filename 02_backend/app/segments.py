@@ -0,0 +1,338 @@
+import argparse
+import fcntl
+import gzip
+import json
+import os
+import re
+import shutil
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+MANIFEST = "manifest.json"
+MONTH = re.compile(r"^\d{4}-\d{2}$")
+COMPRESS_LEVEL = 6
+
+
+class LogStat(NamedTuple):
+    inode: int
+    size: int
+    mtime_ns: int
+
+
+def segments_dir(path: Path) -> Path:
+    """Where the sealed segments of ``path`` live: ``events.jsonl.segments/`` next to it."""
+    return path.with_name(path.name + ".segments")
+
+
+# manifest path -> ((inode, mtime, size), manifest). The manifest is only
+# ever replaced, never edited in place, so a new inode means new content.
+_manifests: dict[Path, tuple[tuple[int, int, int], dict]] = {}
+
+
+def load(path: Path) -> Optional[dict]:
+    """The segment manifest of the log at ``path``, or None for a plain single-file log.
+
+    The manifest lists the sealed segments in log order. Each one holds the
+    lines of one month (by time of writing), gzip-compressed, and records
+    ``start`` (its logical offset), ``length`` (uncompressed bytes),
+    ``lines`` and ``first_day``/``last_day``: the range of days its lines
+    affect, including the day an edited or deleted record lived on before.
+    ``base`` is the logical offset of the active file's first byte.
+    """
+    manifest_path = segments_dir(path) / MANIFEST
+    try:
+        st = os.stat(manifest_path)
+    except FileNotFoundError:
+        return None
+    stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+    cached = _manifests.get(manifest_path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    manifest = json.loads(manifest_path.read_text())
+    _manifests[manifest_path] = (stamp, manifest)
+    return manifest
+
+
+def _save(path: Path, manifest: dict):
+    directory = segments_dir(path)
+    tmp = directory / f"{MANIFEST}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=1)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, directory / MANIFEST)
+
+
+def _skip(manifest: dict, size: int) -> int:
+    """Bytes at the start of the active file that were already moved into the last segment.
+
+    Non-zero only if a seal was interrupted between writing the manifest
+    and truncating the active file.
+    """
+    trim = manifest.get("trim")
+    return trim["bytes"] if trim and size == trim["active_size"] else 0
+
+
+@contextmanager
+def active(path: Path):
+    """Open the active file for reading under a shared lock.
+
+    Yields ``(file, manifest, origin)``: the file positioned at its first
+    live byte, the manifest matching it, and the logical offset of the
+    file's byte 0 (physical position = logical offset - origin). Seals take
+    the exclusive lock, so both stay consistent until the block exits.
+    """
+    with open(path, "rb") as f:
+        fcntl.flock(f, fcntl.LOCK_SH)
+        try:
+            manifest = load(path)
+            origin = 0
+            if manifest is not None:
+                skip = _skip(manifest, os.fstat(f.fileno()).st_size)
+                origin = manifest["base"] - skip
+                f.seek(skip)
+            yield f, manifest, origin
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def log_stat(path: Path) -> LogStat:
+    """Inode and mtime of the active file and the logical size of the whole log.
+
+    For a plain log this is just ``os.stat``. Raises FileNotFoundError if
+    the active file does not exist.
+    """
+    if load(path) is None:
+        st = os.stat(path)
+        return LogStat(st.st_ino, st.st_size, st.st_mtime_ns)
+    with active(path) as (f, _, origin):
+        st = os.fstat(f.fileno())
+        return LogStat(st.st_ino, origin + st.st_size, st.st_mtime_ns)
+
+
+def open_segment(path: Path, segment: dict):
+    """A sealed segment as a binary stream of its uncompressed lines (forward seeks decompress)."""
+    return gzip.open(segments_dir(path) / segment["file"], "rb")
+
+
+def overlapping(manifest: dict, from_day: str, to_day: str) -> list[dict]:
+    """Sealed segments whose lines can affect any day in ``[from_day, to_day]``."""
+    return [s for s in manifest["segments"]
+            if s["first_day"] is None or (s["first_day"] <= to_day and s["last_day"] >= from_day)]
+
+
+def _write_segment(path: Path, name: str, data: bytes):
+    target = segments_dir(path) / name
+    tmp = target.with_name(f"{name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(gzip.compress(data, compresslevel=COMPRESS_LEVEL, mtime=0))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, target)
+
+
+def _day_map(path: Path, manifest: dict) -> dict[str, str]:
+    name = manifest.get("days_file")
+    if not name:
+        return {}
+    return json.loads((segments_dir(path) / name).read_text())
+
+
+def _affected_days(data: bytes, manifest: dict, last_day: dict[str, str]) -> set[str]:
+    """Days the lines in ``data`` affect; updates ``last_day`` (record key -> day) as it goes."""
+    days = set()
+    for line in data.split(b"\n"):
+        if not line.strip():
+            continue
+        entry = json.loads(line)
+        day = str(entry.get(manifest["day_field"], ""))[:10]
+        key = str(entry.get(manifest["key"]))
+        days.update(d for d in (day, last_day.get(key)) if d)
+        last_day[key] = day
+    return days
+
+
+def _truncate(path: Path, f, data: bytes, cut: int):
+    """Drop the first ``cut`` bytes of the active file, keeping its inode and mtime."""
+    st = os.fstat(f.fileno())
+    os.ftruncate(f.fileno(), 0)
+    f.write(data[cut:])
+    f.flush()
+    os.fsync(f.fileno())
+    # The log's logical content is unchanged, so readers comparing mtimes
+    # (see DayOffsetIndex) shouldn't see a rewrite
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+
+def _seal(path: Path, f, manifest: dict, data: bytes, cuts: list[tuple[str, int]], active_month: str):
+    """Move ``data[:end]`` of the active file into one segment per ``(month, end)`` in ``cuts``.
+
+    ``f`` is the active file, opened for appending and locked exclusively;
+    ``data`` its current content. The manifest is written before the
+    active file is truncated, with a ``trim`` marker so that readers skip
+    the moved bytes if the truncation never happens.
+    """
+    last_day = _day_map(path, manifest)
+    names = {s["file"] for s in manifest["segments"]}
+    start = 0
+    for month, end in cuts:
+        chunk = data[start:end]
+        days = _affected_days(chunk, manifest, last_day)
+        name = f"{month}.jsonl.gz"
+        n = 1
+        while name in names:
+            n += 1
+            name = f"{month}-{n}.jsonl.gz"
+        names.add(name)
+        _write_segment(path, name, chunk)
+        manifest["segments"].append({
+            "file": name,
+            "month": month,
+            "start": manifest["base"] + start,
+            "length": len(chunk),
+            "lines": chunk.count(b"\n"),
+            "first_day": min(days) if days else None,
+            "last_day": max(days) if days else None,
+        })
+        start = end
+
+    old_days_file = manifest.get("days_file")
+    manifest["base"] += start
+    manifest["days_file"] = f"days.{manifest['base']}.json"
+    (segments_dir(path) / manifest["days_file"]).write_text(json.dumps(last_day, separators=(",", ":")))
+    manifest["active_month"] = active_month
+    manifest["trim"] = {"bytes": start, "active_size": len(data)}
+    _save(path, manifest)
+
+    _truncate(path, f, data, start)
+    del manifest["trim"]
+    _save(path, manifest)
+    if old_days_file and old_days_file != manifest["days_file"]:
+        (segments_dir(path) / old_days_file).unlink(missing_ok=True)
+
+
+def _current_month() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m")
+
+
+def roll(path: Path, f) -> int:
+    """Seal the active file if its month is over; returns the logical offset of its first byte.
+
+    Called by the writer with the active file ``f`` locked exclusively,
+    before every append. Also completes a seal that was interrupted before
+    the active file was truncated. A no-op (returning 0) for plain logs.
+    """
+    if load(path) is None:
+        return 0
+    manifest = json.loads((segments_dir(path) / MANIFEST).read_text())
+    trim = manifest.get("trim")
+    if trim:
+        if _skip(manifest, os.fstat(f.fileno()).st_size):
+            _truncate(path, f, Path(path).read_bytes(), trim["bytes"])
+        del manifest["trim"]
+        _save(path, manifest)
+
+    month = _current_month()
+    if month > manifest["active_month"]:
+        data = Path(path).read_bytes()
+        end = data.rfind(b"\n") + 1
+        if end:
+            _seal(path, f, manifest, data, [(manifest["active_month"], end)], month)
+        else:
+            manifest["active_month"] = month
+            _save(path, manifest)
+    return manifest["base"]
+
+
+def migrate(path: Path, day_field: str = "client_timestamp", time_field: str = "received_at",
+            key: str = "id") -> dict:
+    """Convert a single-file log into sealed monthly segments plus the active file.
+
+    Lines are grouped into contiguous runs by the month of ``time_field``
+    (when they were written; ``day_field`` if missing). Every month before
+    the current one is sealed; the rest stays in the active file. Logical
+    offsets equal the old byte offsets, so change cursors, snapshots and
+    sidecars stay valid. Safe while the server runs: the file is locked
+    like any append and keeps its inode.
+    """
+    directory = segments_dir(path)
+    with open(path, "ab") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            if load(path) is not None:
+                raise ValueError(f"{path} is already segmented")
+            data = Path(path).read_bytes()
+            now = _current_month()
+            cuts: list[tuple[str, int]] = []
+            month = None
+            pos = 0
+            for line in data.split(b"\n")[:-1]:
+                if line.strip():
+                    entry = json.loads(line)
+                    written = str(entry.get(time_field) or entry.get(day_field) or "")[:7]
+                    # Out-of-order timestamps stay in the current run
+                    if MONTH.match(written) and (month is None or written > month):
+                        if written >= now:
+                            break
+                        if month is not None:
+                            cuts.append((month, pos))
+                        month = written
+                pos += len(line) + 1
+            if month is not None:
+                cuts.append((month, pos))
+
+            directory.mkdir(exist_ok=True)
+            manifest = {"version": 1, "day_field": day_field, "key": key, "base": 0,
+                        "active_month": now, "segments": []}
+            if cuts:
+                _seal(path, f, manifest, data, cuts, now)
+            else:
+                _save(path, manifest)
+            return manifest
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monthly compressed segments for an append-only JSONL log")
+    parser.add_argument("command", choices=["migrate", "status", "cat"],
+                        help="migrate: split the log into segments; status: list them; cat: print the whole log")
+    parser.add_argument("--file", default=os.environ.get("HUXA_EVENTS_FILE", "/var/lib/huxa/events.jsonl"))
+    parser.add_argument("--day-field", default="client_timestamp", help="Field giving the day a record is about")
+    parser.add_argument("--time-field", default="received_at", help="Field giving when a line was written")
+    parser.add_argument("--key", default="id", help="Record key (updates and deletes share it)")
+    args = parser.parse_args()
+    path = Path(args.file)
+
+    if args.command == "migrate":
+        before = path.stat().st_size
+        try:
+            manifest = migrate(path, args.day_field, args.time_field, args.key)
+        except ValueError as e:
+            sys.exit(str(e))
+        sealed = sum((segments_dir(path) / s["file"]).stat().st_size for s in manifest["segments"])
+        print(f"Sealed {len(manifest['segments'])} month(s): {manifest['base']} bytes -> {sealed} compressed; "
+              f"{before - manifest['base']} bytes stay in {path.name}")
+    elif args.command == "status":
+        manifest = load(path)
+        if manifest is None:
+            sys.exit(f"{path} is not segmented (run: python -m app.segments migrate)")
+        for s in manifest["segments"]:
+            size = (segments_dir(path) / s["file"]).stat().st_size
+            print(f"{s['file']:<22} {s['lines']:>8} lines {s['length']:>12} -> {size:>10} bytes  "
+                  f"days {s['first_day']} .. {s['last_day']}")
+        print(f"{path.name:<22} active since {manifest['active_month']}, logical offset {manifest['base']}")
+    else:
+        manifest = load(path)
+        for s in manifest["segments"] if manifest else []:
+            with open_segment(path, s) as f:
+                shutil.copyfileobj(f, sys.stdout.buffer)
+        with active(path) as (f, _, _):
+            shutil.copyfileobj(f, sys.stdout.buffer)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import os
+import tempfile
+from pathlib import Path
+
+from fastapi import HTTPException, Request
+from python_multipart.multipart import MultipartParser, parse_options_header
+from starlette.concurrency import run_in_threadpool
+
+
+class _FilePart:
+    """Collects parser callbacks for the multipart part named ``field``."""
+
+    def __init__(self, field: str):
+        self.field = field
+        self.headers: dict[bytes, bytes] = {}
+        self.header_field = b""
+        self.header_value = b""
+        self.active = False
+        self.found = False
+        self.content_type = ""
+        self.chunks: list[bytes] = []
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": lambda data, start, end: self._extend("header_field", data[start:end]),
+            "on_header_value": lambda data, start, end: self._extend("header_value", data[start:end]),
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+        }
+
+    def _extend(self, name: str, data: bytes):
+        setattr(self, name, getattr(self, name) + data)
+
+    def on_part_begin(self):
+        self.headers = {}
+        self.active = False
+
+    def on_header_end(self):
+        self.headers[self.header_field.lower()] = self.header_value
+        self.header_field = self.header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self.headers.get(b"content-disposition", b""))
+        if options.get(b"name", b"").decode() == self.field and not self.found:
+            self.active = self.found = True
+            self.content_type = self.headers.get(b"content-type", b"").decode().strip()
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self.active:
+            self.chunks.append(data[start:end])
+
+
+async def receive_file(request: Request, field: str, dest_dir: Path, max_bytes: int,
+                       allowed_types: set[str]) -> tuple[Path, str]:
+    """Stream the ``field`` part of a multipart upload into a temp file in ``dest_dir``.
+
+    The body is parsed as it arrives, so an oversized upload is rejected as
+    soon as it crosses ``max_bytes`` rather than after it has been buffered.
+    Returns the temp file path (the caller moves it into place) and the
+    part's content type.
+    """
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_bytes + 64 * 1024:
+        raise HTTPException(status_code=400, detail="File too large (max 10 MB)")
+
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload")
+
+    part = _FilePart(field)
+    parser = MultipartParser(params[b"boundary"], part.callbacks())
+
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=dest_dir, prefix=".upload-")
+    tmp = Path(tmp_name)
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            async for chunk in request.stream():
+                parser.write(chunk)
+                if part.found and part.content_type not in allowed_types:
+                    raise HTTPException(status_code=400, detail="Only JPEG, PNG, WebP, and GIF images are allowed")
+                if part.chunks:
+                    data = b"".join(part.chunks)
+                    part.chunks.clear()
+                    size += len(data)
+                    if size > max_bytes:
+                        raise HTTPException(status_code=400, detail="File too large (max 10 MB)")
+                    await run_in_threadpool(out.write, data)
+            parser.finalize()
+        if not part.found:
+            raise HTTPException(status_code=400, detail=f"Missing form field '{field}'")
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return tmp, part.content_type
@@ -0,0 +1,180 @@
+import fcntl
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+
+from app.metrics import APPEND_BYTES, APPEND_LINES, APPEND_SECONDS
+from app.segments import roll
+
+FSYNC_MODES = ("none", "batch", "write")
+
+
+class WriterBusy(Exception):
+    """The append queue stayed full for longer than the writer's timeout."""
+
+
+class WriterClosed(Exception):
+    """The writer was closed; it accepts no more appends."""
+
+
+class AppendWriter:
+    """Group-commit writer for one append-only JSONL file.
+
+    Callers enqueue lines on a bounded queue and block until a background
+    thread has written them. Whatever is queued when the thread wakes up is
+    written with a single ``write`` call while holding an exclusive
+    ``flock`` on the file, so lines never interleave — not even with other
+    worker processes or scripts that take the same lock.
+
+    ``fsync`` selects durability: ``"none"`` leaves flushing to the OS,
+    ``"batch"`` fsyncs once per batch and ``"write"`` fsyncs after every line.
+    After ``close`` every append raises ``WriterClosed``.
+    """
+
+    def __init__(self, path: Path, fsync: str = "none", max_queue: int = 1024,
+                 max_batch: int = 256, timeout: float = 5.0):
+        if fsync not in FSYNC_MODES:
+            raise ValueError(f"fsync must be one of {FSYNC_MODES}, not {fsync!r}")
+        self.path = path
+        self.fsync = fsync
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._file = None
+        # Guards starting and stopping the thread; close waits on it until
+        # no append is between its closed check and its enqueue
+        self._state = threading.Condition()
+        self._thread = None
+        self._closed = False
+        self._enqueuing = 0
+
+    def append(self, record: dict) -> int:
+        """Append one record and return the byte offset of its line."""
+        return self.append_many([record])[0]
+
+    def append_many(self, records: list[dict]) -> list[int]:
+        """Append records as consecutive lines and return their byte offsets."""
+        lines = [(json.dumps(r, default=str) + "\n").encode() for r in records]
+        if not lines:
+            return []
+        with self._state:
+            if self._closed:
+                raise WriterClosed(f"writer for {self.path.name} is closed")
+            self._ensure_started()
+            self._enqueuing += 1
+        done: Future = Future()
+        try:
+            self._queue.put((lines, done), timeout=self.timeout)
+        except queue.Full:
+            raise WriterBusy(f"append queue for {self.path.name} is full") from None
+        finally:
+            with self._state:
+                self._enqueuing -= 1
+                self._state.notify_all()
+        return done.result()
+
+    def _ensure_started(self):
+        # Called with self._state held
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name=f"writer-{self.path.name}", daemon=True,
+            )
+            self._thread.start()
+
+    def close(self):
+        """Write everything queued so far, then stop the thread and close the file."""
+        with self._state:
+            self._closed = True
+            # Appends already past the closed check get queued before the stop marker
+            self._state.wait_for(lambda: self._enqueuing == 0)
+            thread = self._thread
+            if thread is not None:
+                self._queue.put(None)
+                thread.join()
+                self._thread = None
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            batch = [item for item in batch if item is not None]
+            if stop and not batch:
+                self._close()
+                return
+            try:
+                offsets = self._write([lines for lines, _ in batch])
+            except Exception as e:
+                self._close()
+                for _, done in batch:
+                    done.set_exception(e)
+                if stop:
+                    return
+                continue
+            for (_, done), result in zip(batch, offsets):
+                done.set_result(result)
+            if stop:
+                self._close()
+                return
+
+    def _open(self):
+        # Reopen if the file was rotated or replaced under us
+        if self._file is not None:
+            try:
+                if os.stat(self.path).st_ino == os.fstat(self._file.fileno()).st_ino:
+                    return self._file
+            except FileNotFoundError:
+                pass
+            self._close()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "ab")
+        return self._file
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    @property
+    def pending(self) -> int:
+        """Appends queued but not yet written."""
+        return self._queue.qsize()
+
+    def _write(self, batch: list[list[bytes]]) -> list[list[int]]:
+        start = time.perf_counter()
+        f = self._open()
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            # A segmented log seals its active file here once the month is
+            # over; offsets are logical across segments
+            pos = roll(self.path, f) + f.seek(0, os.SEEK_END)
+            offsets = []
+            for lines in batch:
+                starts = []
+                for line in lines:
+                    starts.append(pos)
+                    pos += len(line)
+                    if self.fsync == "write":
+                        f.write(line)
+                        f.flush()
+                        os.fsync(f.fileno())
+                offsets.append(starts)
+            if self.fsync != "write":
+                f.write(b"".join(line for lines in batch for line in lines))
+                f.flush()
+                if self.fsync == "batch":
+                    os.fsync(f.fileno())
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+        APPEND_LINES.inc(self.path.name, value=sum(len(lines) for lines in batch))
+        APPEND_BYTES.inc(self.path.name, value=sum(len(line) for lines in batch for line in lines))
+        APPEND_SECONDS.observe(time.perf_counter() - start, self.path.name)
+        return offsets
@@ -0,0 +1,109 @@
+"""
+Concurrent appends: the old open-and-append path against AppendWriter in
+each HUXA_FSYNC mode.
+
+Usage (from 02_backend/):
+    python -m benchmarks.appends --threads 16 --appends 500
+    python -m benchmarks.appends --dir /var/lib/huxa/bench --modes none batch
+
+Every thread appends ``--appends`` event-sized records, one per call, as
+concurrent POSTs would. ``baseline`` is what the handlers did before the
+writer: open the file in append mode, write, close (no lock, no fsync).
+The writer modes go through one shared AppendWriter. Per-append latency
+(p50/p99) and total throughput are reported per mode and written as JSON
+(see results.py). Files are written to a temporary directory, or under
+``--dir`` to measure a specific disk; fsync costs depend entirely on it.
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from app.writer import FSYNC_MODES, AppendWriter
+from benchmarks.results import percentiles, save
+
+
+def record(i: int) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "client_timestamp": "2026-02-14T12:00:00Z",
+        "received_at": "2026-02-14T12:00:01Z",
+        "type": "Intervention",
+        "text": f"Took magnesium 200mg before bed ({i})",
+        "metrics": {"dose_mg": 200},
+        "meta": {},
+    }
+
+
+def baseline_append(path: Path):
+    def append(entry: dict):
+        with open(path, "a") as f:
+            f.write(json.dumps(entry, default=str) + "\n")
+    return append, lambda: None
+
+
+def writer_append(path: Path, fsync: str):
+    writer = AppendWriter(path, fsync=fsync)
+    return writer.append, writer.close
+
+
+def run(append, threads: int, appends: int) -> dict:
+    samples: list[list[float]] = [[] for _ in range(threads)]
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(n: int):
+        barrier.wait()
+        for i in range(appends):
+            start = time.perf_counter()
+            append(record(i))
+            samples[n].append(time.perf_counter() - start)
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for t in pool:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - start
+    result = percentiles([s for thread in samples for s in thread])
+    result["appends_per_s"] = round(threads * appends / elapsed, 1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent append benchmark")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--appends", type=int, default=500, help="Appends per thread (default: 500)")
+    parser.add_argument("--modes", nargs="+", default=["baseline", *FSYNC_MODES],
+                        choices=["baseline", *FSYNC_MODES])
+    parser.add_argument("--dir", help="Directory to write the test files in (default: a temporary one)")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/appends-<time>.json)")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        for mode in args.modes:
+            path = Path(tmp) / f"{mode}.jsonl"
+            append, close = baseline_append(path) if mode == "baseline" else writer_append(path, mode)
+            try:
+                results[mode] = run(append, args.threads, args.appends)
+            finally:
+                close()
+            lines = sum(1 for _ in open(path, "rb"))
+            assert lines == args.threads * args.appends, (mode, lines)
+
+    params = {"threads": args.threads, "appends": args.appends, "dir": args.dir or ""}
+    path = save("appends", params, results, args.output)
+    for mode, r in results.items():
+        print(f"{mode:<10} {r['appends_per_s']:>10.0f} appends/s   p50 {r['p50_ms']:8.3f} ms   p99 {r['p99_ms']:8.3f} ms")
+    print(f"Saved {path}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Compare serializing a range of events through the response models with the
+pre-encoded bytes served by the event index.
+
+Usage (from 02_backend/):
+    python -m benchmarks.bench_serialization --events 20000 --repeat 5
+"""
+
+import argparse
+import json
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.encoding import event_json, json_array
+from app.index import EventIndex
+from app.models.event import EventStored
+
+
+def write_events(path: Path, count: int):
+    with open(path, "w") as f:
+        for i in range(count):
+            f.write(json.dumps({
+                "id": str(uuid.uuid4()),
+                "client_timestamp": f"2026-01-{i % 28 + 1:02d}T{i % 24:02d}:00:00Z",
+                "type": "Intervention",
+                "text": f"Took magnesium {i % 400}mg before bed",
+                "metrics": {"dose_mg": i % 400, "with_food": bool(i % 2)},
+                "meta": {"version": 1},
+                "received_at": "2026-01-01T00:00:00Z",
+            }) + "\n")
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Event list serialization benchmark")
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "events.jsonl"
+        write_events(path, args.events)
+        plain = EventIndex(path)
+        encoded = EventIndex(path, encode=event_json)
+        plain.refresh()
+        encoded.refresh()
+
+        def models():
+            # What list_events did before: build models, then let FastAPI encode them
+            results = [EventStored(**e) for e in plain.between("2026-01-01", "2026-01-31")]
+            return JSONResponse(jsonable_encoder(results)).body
+
+        def raw():
+            return json_array(encoded.between("2026-01-01", "2026-01-31", raw=True))
+
+        cold = timed(raw, 1)
+        warm = timed(raw, args.repeat)
+        baseline = timed(models, args.repeat)
+        assert json.loads(models()) == json.loads(raw())
+
+    print(f"{args.events} events")
+    print(f"  response models:         {baseline * 1000:8.1f} ms")
+    print(f"  pre-encoded, first read: {cold * 1000:8.1f} ms")
+    print(f"  pre-encoded, cached:     {warm * 1000:8.1f} ms  ({baseline / warm:.0f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Deterministic synthetic data for benchmarks: events, diary entries and
+feedback reports spanning several years, written as the server writes them.
+
+Usage (from 02_backend/):
+    python -m benchmarks.generate /tmp/huxa-bench --years 5 --seed 1
+
+The same arguments always produce byte-identical files. Besides the latest
+versions, the logs contain what a long-lived store accumulates: edited
+events (appended again later with the same id), delete markers, re-saved
+diary days and deleted or updated reports.
+"""
+
+import argparse
+import json
+import random
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+INTERVENTIONS = [
+    ("Took magnesium {dose}mg before bed", "dose_mg", (100, 400)),
+    ("Took ibuprofen {dose}mg", "dose_mg", (200, 800)),
+    ("Walked {dose} minutes outside", "minutes", (10, 90)),
+    ("Drank {dose} cups of coffee", "cups", (1, 4)),
+    ("Stretched hips for {dose} minutes", "minutes", (5, 30)),
+]
+SYMPTOMS = ["Headache behind the eyes", "Hip pain when sitting", "Bloated after lunch",
+            "Tired all afternoon", "Neck tension", "Trouble falling asleep"]
+NOTES = ["Long day at work", "Visited family", "Cold and rainy", "Slept in",
+         "Skipped breakfast", "Started a new book", "Felt more focused than usual"]
+TYPES = ["Intervention", "Symptom", "Event", "Thought", "Decision"]
+TYPE_WEIGHTS = [4, 3, 2, 1, 1]
+SCALES = ["sleep", "headaches", "energy", "hip_pain"]
+TEXTS = ["gut", "physical", "mental", "life", "activity", "gratitude"]
+# Generated data ends the day before this date
+END = "2026-01-01"
+
+
+def _ts(dt: datetime) -> str:
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _event(rng: random.Random, event_id: str, at: datetime) -> dict:
+    kind = rng.choices(TYPES, TYPE_WEIGHTS)[0]
+    metrics = {}
+    if kind == "Intervention":
+        template, metric, (lo, hi) = rng.choice(INTERVENTIONS)
+        dose = rng.randint(lo, hi)
+        text = template.format(dose=dose)
+        metrics[metric] = dose
+    elif kind == "Symptom":
+        text = rng.choice(SYMPTOMS)
+        metrics["intensity"] = rng.randint(1, 10)
+    else:
+        text = rng.choice(NOTES)
+    return {
+        "id": event_id,
+        "client_timestamp": _ts(at),
+        "type": kind,
+        "text": text,
+        "metrics": metrics,
+        "meta": {"version": 1},
+    }
+
+
+def dates(years: float) -> list[str]:
+    """The days covered by ``generate(years=...)``, oldest first."""
+    days = int(years * 365)
+    first = date.fromisoformat(END) - timedelta(days=days)
+    return [(first + timedelta(days=i)).isoformat() for i in range(days)]
+
+
+def generate(out_dir: Path, years: float = 1, events_per_day: int = 12, seed: int = 0,
+             update_rate: float = 0.05, delete_rate: float = 0.02) -> dict:
+    """Write events.jsonl, diary.jsonl and feedback.jsonl to ``out_dir``; returns line counts.
+
+    ``update_rate`` and ``delete_rate`` are the fractions of events that get
+    edited or deleted a few days after they were logged.
+    """
+    rng = random.Random(seed)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    counts = {"events": 0, "diary": 0, "feedback": 0}
+    # Day index -> edits and delete markers due that day
+    pending: dict[int, list[dict]] = {}
+
+    with open(out_dir / "events.jsonl", "w") as events, open(out_dir / "diary.jsonl", "w") as diary, \
+            open(out_dir / "feedback.jsonl", "w") as feedback:
+        reports = []
+        for i, day in enumerate(dates(years)):
+            start = datetime.fromisoformat(day).replace(hour=6, tzinfo=timezone.utc)
+            offsets = sorted(rng.randrange(17 * 3600) for _ in range(max(0, int(rng.gauss(events_per_day, 3)))))
+            lines = []
+            for offset in offsets:
+                at = start + timedelta(seconds=offset)
+                event = _event(rng, _uuid(rng), at)
+                lines.append({**event, "received_at": _ts(at + timedelta(seconds=rng.randint(1, 30)))})
+                later = i + rng.randint(1, 7)
+                roll = rng.random()
+                if roll < delete_rate:
+                    pending.setdefault(later, []).append({
+                        "id": event["id"], "client_timestamp": "", "received_at": "", "type": "Event",
+                        "text": "", "metrics": {}, "meta": {"version": 1, "deleted": True},
+                    })
+                elif roll < delete_rate + update_rate:
+                    edited = {**event, "text": event["text"] + " (edited)", "meta": {"version": 2}}
+                    pending.setdefault(later, []).append(edited)
+            for change in pending.pop(i, []):
+                at = _ts(start + timedelta(hours=17, seconds=rng.randrange(3600)))
+                if change["meta"].get("deleted"):
+                    change = {**change, "client_timestamp": at}
+                lines.append({**change, "received_at": at})
+            for line in lines:
+                events.write(json.dumps(line) + "\n")
+            counts["events"] += len(lines)
+
+            # Most days have a diary entry; some are saved twice
+            saved = start + timedelta(hours=16)
+            for _ in range(rng.choice([0, 1, 1, 1, 1, 1, 1, 2])):
+                answers = {k: rng.randint(1, 10) for k in SCALES}
+                answers.update({k: rng.choice(NOTES) for k in rng.sample(TEXTS, 3)})
+                diary.write(json.dumps({
+                    "id": _uuid(rng), "date": day, "answers": answers,
+                    "saved_at": _ts(saved), "meta": {"version": 1},
+                }) + "\n")
+                counts["diary"] += 1
+                saved += timedelta(minutes=rng.randint(1, 120))
+
+            if rng.random() < 0.05:
+                report = {"id": _uuid(rng), "type": rng.choice(["bug", "feature"]),
+                          "text": rng.choice(NOTES), "created_at": _ts(start), "attachment": None,
+                          "meta": {"version": 1}}
+                reports.append(report)
+                feedback.write(json.dumps(report) + "\n")
+                counts["feedback"] += 1
+                if len(reports) > 3 and rng.random() < 0.3:
+                    old = reports.pop(rng.randrange(len(reports)))
+                    marker = {**old, "meta": {"version": 1, "deleted": True}} if rng.random() < 0.5 \
+                        else {**old, "attachment": f"{old['id']}.png"}
+                    feedback.write(json.dumps(marker) + "\n")
+                    counts["feedback"] += 1
+    return counts
+
+
+def server_env(data_dir: Path, token: str = "bench") -> dict[str, str]:
+    """The HUXA_* variables that point the backend at a generated data directory."""
+    return {
+        "HUXA_EVENTS_FILE": str(data_dir / "events.jsonl"),
+        "HUXA_DIARY_FILE": str(data_dir / "diary.jsonl"),
+        "HUXA_FEEDBACK_FILE": str(data_dir / "feedback.jsonl"),
+        "HUXA_ATTACHMENTS_DIR": str(data_dir / "attachments"),
+        "HUXA_DERIVED_DIR": str(data_dir / "derived"),
+        "HUXA_AUTH_TOKEN": token,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic HuXa data for benchmarks")
+    parser.add_argument("out_dir", help="Directory for events.jsonl, diary.jsonl and feedback.jsonl")
+    parser.add_argument("--years", type=float, default=1)
+    parser.add_argument("--events-per-day", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--update-rate", type=float, default=0.05)
+    parser.add_argument("--delete-rate", type=float, default=0.02)
+    args = parser.parse_args()
+
+    counts = generate(Path(args.out_dir), args.years, args.events_per_day, args.seed,
+                      args.update_rate, args.delete_rate)
+    print(", ".join(f"{n} {name} lines" for name, n in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+HTTP load test against a local uvicorn server, with the OpenAI stub standing
+in for the API.
+
+Usage (from 02_backend/):
+    python -m benchmarks.load --years 3 --concurrency 16 --duration 30
+    python -m benchmarks.load --url http://127.0.0.1:8000 --token "$HUXA_AUTH_TOKEN"
+
+By default synthetic data is generated into a temporary directory, and
+05_scripts/openai_stub.py and uvicorn are started on free local ports with
+HUXA_* and OPENAI_BASE_URL pointing at them. With --url the requests go to
+an already running server instead (nothing is started or generated; the
+dates requested are those of generate.py's data).
+
+``--concurrency`` clients send a weighted mix of requests (see MIX) for
+``--duration`` seconds. p50/p99 latency and throughput, per request kind
+and overall, are printed and written as JSON (see results.py). Only
+served requests (2xx, and 404 for days without a diary entry) are counted
+in latency and throughput; every response status is tallied, so requests
+shed with 503 under load show up as ``failed``.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+import httpx
+
+from benchmarks.generate import dates, generate, server_env
+from benchmarks.results import percentiles, save
+
+STUB = Path(__file__).resolve().parents[2] / "05_scripts" / "openai_stub.py"
+
+# Request kind -> relative weight
+MIX = {
+    "list_events.day": 40,
+    "list_events.month": 10,
+    "get_diary": 20,
+    "list_feedback": 5,
+    "create_event": 20,
+    "query": 5,
+}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until_up(url: str, process: subprocess.Popen, timeout: float = 120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            sys.exit(f"{process.args[0]} exited with {process.returncode}")
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.TransportError:
+            time.sleep(0.2)
+    sys.exit(f"{url} did not come up within {timeout:.0f}s")
+
+
+def request(kind: str, rng: random.Random, days: list[str]) -> tuple[str, str, dict]:
+    """(method, path, json body) for one request of ``kind``."""
+    day = rng.choice(days)
+    if kind == "list_events.day":
+        return "GET", f"/events?date={day}", None
+    if kind == "list_events.month":
+        return "GET", f"/events?from={day[:7]}-01&to={day[:7]}-31", None
+    if kind == "get_diary":
+        return "GET", f"/diary/{day}", None
+    if kind == "list_feedback":
+        return "GET", "/reports", None
+    if kind == "create_event":
+        return "POST", "/events", {
+            "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "client_timestamp": f"{day}T12:00:00Z",
+            "type": "Symptom",
+            "text": "Headache behind the eyes",
+            "metrics": {"intensity": rng.randint(1, 10)},
+        }
+    return "POST", "/query", {"question": "Does magnesium help my headaches?", "from": day, "to": day}
+
+
+async def drive(url: str, token: str, days: list[str], concurrency: int, duration: float, seed: int) -> dict:
+    kinds = list(MIX)
+    weights = [MIX[k] for k in kinds]
+    samples: dict[str, list[float]] = {k: [] for k in kinds}
+    # Request kind -> response status (or "error" for transport errors) -> count
+    statuses: dict[str, dict[str, int]] = {k: {} for k in kinds}
+    deadline = time.perf_counter() + duration
+
+    async def client(n: int, http: httpx.AsyncClient):
+        rng = random.Random(seed * 1000 + n)
+        while time.perf_counter() < deadline:
+            kind = rng.choices(kinds, weights)[0]
+            method, path, body = request(kind, rng, days)
+            start = time.perf_counter()
+            try:
+                r = await http.request(method, path, json=body)
+                status = str(r.status_code)
+            except httpx.HTTPError:
+                status = "error"
+            # Latency is only sampled for served requests (a missing diary day is one)
+            if status.startswith("2") or status == "404":
+                samples[kind].append(time.perf_counter() - start)
+            statuses[kind][status] = statuses[kind].get(status, 0) + 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, headers={"Authorization": f"Bearer {token}"},
+                                 limits=limits, timeout=60) as http:
+        started = time.perf_counter()
+        await asyncio.gather(*(client(n, http) for n in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    results = {}
+    for kind in kinds:
+        results[kind] = {**percentiles(samples[kind]), "rps": round(len(samples[kind]) / elapsed, 2),
+                         "status": statuses[kind], "failed": sum(statuses[kind].values()) - len(samples[kind])}
+    everything = [s for kind in kinds for s in samples[kind]]
+    results["all"] = {**percentiles(everything), "rps": round(len(everything) / elapsed, 2),
+                      "failed": sum(r["failed"] for r in results.values())}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HuXa HTTP load test")
+    parser.add_argument("--url", help="Test a running server instead of starting one")
+    parser.add_argument("--token", default="bench", help="Bearer token (with --url)")
+    parser.add_argument("--years", type=float, default=1)
+    parser.add_argument("--events-per-day", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=20, help="Seconds")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--llm-delay", type=float, default=0.5, help="OpenAI stub latency in seconds")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/load-<time>.json)")
+    args = parser.parse_args()
+
+    params = {"years": args.years, "events_per_day": args.events_per_day, "seed": args.seed,
+              "concurrency": args.concurrency, "duration": args.duration, "mix": MIX}
+    days = dates(args.years)
+    if args.url:
+        params["url"] = args.url
+        results = asyncio.run(drive(args.url, args.token, days, args.concurrency, args.duration, args.seed))
+    else:
+        params.update(workers=args.workers, llm_delay=args.llm_delay)
+        with tempfile.TemporaryDirectory() as tmp:
+            data = Path(tmp)
+            params["lines"] = generate(data, args.years, args.events_per_day, args.seed)
+            stub_port, port = free_port(), free_port()
+            env = {**os.environ, **server_env(data),
+                   "OPENAI_BASE_URL": f"http://127.0.0.1:{stub_port}/v1", "OPENAI_API_KEY": "stub"}
+            stub = subprocess.Popen([sys.executable, str(STUB), "--port", str(stub_port),
+                                     "--delay", str(args.llm_delay)],
+                                     stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            server = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+                 "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"],
+                env=env, cwd=Path(__file__).resolve().parents[1])
+            try:
+                url = f"http://127.0.0.1:{port}"
+                wait_until_up(f"{url}/health", server)
+                results = asyncio.run(drive(url, "bench", days, args.concurrency, args.duration, args.seed))
+            finally:
+                for process in (server, stub):
+                    process.terminate()
+                    process.wait()
+
+    path = save("load", params, results, args.output)
+    for kind, r in results.items():
+        if r["count"]:
+            print(f"{kind:<20} {r['rps']:8.1f} req/s   p50 {r['p50_ms']:9.2f} ms   "
+                  f"p99 {r['p99_ms']:9.2f} ms   failed {r['failed']}")
+    print(f"Saved {path}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Endpoint microbenchmarks through the FastAPI test client, on synthetic data.
+
+Usage (from 02_backend/):
+    python -m benchmarks.micro --years 3 --repeat 200
+    python -m benchmarks.micro --years 10 --output benchmarks/results/micro-10y.json
+
+Data is generated into a temporary directory (see generate.py) and the app
+is imported with HUXA_* pointing at it, so the run never touches real data.
+Each benchmark calls one endpoint ``--repeat`` times; the startup index
+build is timed once. Results are written as JSON (see results.py).
+"""
+
+import argparse
+import os
+import random
+import struct
+import sys
+import tempfile
+import time
+import uuid
+import zlib
+from pathlib import Path
+
+from benchmarks.generate import dates, generate, server_env
+from benchmarks.results import save, timed
+
+HEADERS = {"Authorization": "Bearer bench"}
+
+
+def tiny_png() -> bytes:
+    """A valid 1x1 PNG."""
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", 1, 1, 8, 0, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(b"\x00\x00")) + chunk(b"IEND", b""))
+
+
+def run(client, days: list[str], repeat: int, seed: int) -> dict:
+    rng = random.Random(seed)
+
+    def get(url: str):
+        r = client.get(url, headers=HEADERS)
+        assert r.status_code in (200, 404), (url, r.status_code)
+
+    results = {}
+    results["list_events.day"] = timed(lambda: get(f"/events?date={rng.choice(days)}"), repeat)
+    months = sorted({d[:7] for d in days})
+
+    def month():
+        m = rng.choice(months)
+        get(f"/events?from={m}-01&to={m}-31")
+    results["list_events.month"] = timed(month, repeat)
+    results["list_events.page"] = timed(
+        lambda: get(f"/events?from={days[0]}&to={days[-1]}&limit=200"), repeat)
+    results["get_diary"] = timed(lambda: get(f"/diary/{rng.choice(days)}"), repeat)
+    results["list_feedback"] = timed(lambda: get("/reports"), repeat)
+
+    def create_event():
+        r = client.post("/events", headers=HEADERS, json={
+            "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "client_timestamp": f"{rng.choice(days)}T12:00:00Z",
+            "type": "Intervention",
+            "text": "Took magnesium 200mg before bed",
+            "metrics": {"dose_mg": 200},
+        })
+        assert r.status_code == 201, r.text
+    results["create_event"] = timed(create_event, repeat)
+
+    report = client.post("/reports", headers=HEADERS, json={"type": "bug", "text": "benchmark"}).json()["id"]
+    png = tiny_png()
+
+    def upload_attachment():
+        r = client.post(f"/reports/{report}/attachment", headers=HEADERS,
+                        files={"file": ("shot.png", png, "image/png")})
+        assert r.status_code == 200, r.text
+    results["upload_attachment"] = timed(upload_attachment, repeat)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HuXa endpoint microbenchmarks")
+    parser.add_argument("--years", type=float, default=1)
+    parser.add_argument("--events-per-day", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/micro-<time>.json)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data = Path(tmp)
+        counts = generate(data, args.years, args.events_per_day, args.seed)
+        # The app reads its configuration at import time
+        os.environ.update(server_env(data))
+        from fastapi.testclient import TestClient
+        from app.main import app
+
+        days = dates(args.years)
+        start = time.perf_counter()
+        with TestClient(app) as client:
+            startup = time.perf_counter() - start
+            results = {"startup": {"count": 1, "p50_ms": round(startup * 1000, 3),
+                                   "p99_ms": round(startup * 1000, 3)}}
+            results.update(run(client, days, args.repeat, args.seed))
+
+    params = {"years": args.years, "events_per_day": args.events_per_day, "seed": args.seed,
+              "repeat": args.repeat, "lines": counts}
+    path = save("micro", params, results, args.output)
+    for name, r in results.items():
+        print(f"{name:<20} p50 {r['p50_ms']:9.2f} ms   p99 {r['p99_ms']:9.2f} ms")
+    print(f"Saved {path}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark results as JSON files, and a comparison of two runs.
+
+Usage (from 02_backend/):
+    python -m benchmarks.results benchmarks/results/micro-old.json benchmarks/results/micro-new.json
+
+Every result file holds the run's parameters, the environment it ran in and
+one entry per benchmark with latency percentiles in milliseconds.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def percentiles(samples: list[float]) -> dict:
+    """Count, mean, p50, p99 and max of latencies given in seconds, as milliseconds."""
+    ordered = sorted(samples)
+    if not ordered:
+        return {"count": 0}
+
+    def at(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3)
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+        "p50_ms": at(0.50),
+        "p99_ms": at(0.99),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def timed(fn, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=Path(__file__).parent, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def save(kind: str, params: dict, results: dict, output: str | None = None) -> Path:
+    """Write a run to ``output`` (default ``benchmarks/results/<kind>-<UTC time>.json``)."""
+    now = datetime.now(timezone.utc)
+    path = Path(output) if output else RESULTS_DIR / f"{kind}-{now.strftime('%Y%m%dT%H%M%SZ')}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({
+        "kind": kind,
+        "created_at": now.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "params": params,
+        "results": results,
+    }, indent=2) + "\n")
+    return path
+
+
+def compare(old: dict, new: dict) -> list[str]:
+    lines = [f"{'benchmark':<32} {'p50 old':>10} {'p50 new':>10} {'change':>8}   {'p99 old':>10} {'p99 new':>10} {'change':>8}"]
+    for name, result in new["results"].items():
+        before = old["results"].get(name)
+        if not before or "p50_ms" not in result or "p50_ms" not in before:
+            continue
+        row = f"{name:<32}"
+        for key in ("p50_ms", "p99_ms"):
+            change = (result[key] / before[key] - 1) * 100 if before[key] else 0.0
+            row += f" {before[key]:>10.2f} {result[key]:>10.2f} {change:>+7.1f}%  "
+        lines.append(row.rstrip())
+    if old["params"] != new["params"]:
+        lines.append("note: the runs used different parameters")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    args = parser.parse_args()
+
+    old = json.loads(Path(args.old).read_text())
+    new = json.loads(Path(args.new).read_text())
+    if old["kind"] != new["kind"]:
+        sys.exit(f"Can't compare a {old['kind']} run with a {new['kind']} run")
+    print("\n".join(compare(old, new)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import json
+
+from app.index import DiaryIndex, EventIndex
+
+
+def append(path, *entries):
+    with open(path, "a") as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + "\n")
+
+
+def event(event_id, timestamp):
+    return {"id": event_id, "type": "Symptom", "text": "headache", "client_timestamp": timestamp}
+
+
+def test_bad_event_line_does_not_stall_the_index(tmp_path):
+    path = tmp_path / "events.jsonl"
+    append(path, event("a", "2026-02-01T08:00:00"))
+    index = EventIndex(path)
+    assert [e["id"] for e in index.live()] == ["a"]
+
+    append(path, {"type": "Symptom"}, event("b", None), event("c", "2026-02-01T09:00:00"))
+    assert [e["id"] for e in index.live()] == ["a", "c"]
+    assert index.get("b") is None
+
+    append(path, event("d", "2026-02-02T08:00:00"))
+    assert [e["id"] for e in index.between("2026-02-02", "2026-02-02")] == ["d"]
+
+
+def test_bad_diary_line_does_not_stall_the_index(tmp_path):
+    path = tmp_path / "diary.jsonl"
+    append(path, {"date": None, "answers": {}}, {"answers": {}}, {"date": "2026-02-01", "answers": {"mood": 6}})
+    index = DiaryIndex(path)
+    assert [d["date"] for d in index.live()] == ["2026-02-01"]
+    assert index.get("2026-02-01")["answers"] == {"mood": 6}
+
+
+def test_snapshot_is_written_in_the_background(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.index.SNAPSHOT_EVERY", 2)
+    path = tmp_path / "events.jsonl"
+    snapshot = tmp_path / "derived" / "events.snapshot.json"
+    append(path, event("a", "2026-02-01T08:00:00"), event("b", "2026-02-01T09:00:00"))
+    index = EventIndex(path, snapshot=snapshot)
+    assert len(index.live()) == 2
+    # The write has been handed off; checkpoint waits for it
+    index.checkpoint()
+    assert json.loads(snapshot.read_text())["offset"] == path.stat().st_size
+
+    append(path, event("c", "2026-02-02T08:00:00"))
+    index.live()
+    index.checkpoint()
+    reopened = EventIndex(path, snapshot=snapshot)
+    assert [e["id"] for e in reopened.live()] == ["a", "b", "c"]
+    assert reopened._offset == path.stat().st_size
@@ -0,0 +1,100 @@
+"""
+Benchmark jsonl_scan against a plain line-by-line json.loads pass.
+
+Usage:
+    python bench_scan.py --events 2000000
+    python bench_scan.py --file /var/lib/huxa/events.jsonl --date 2026-02-14
+
+Generates a synthetic events.jsonl (with updates and delete markers) unless
+--file is given, then times a one-day summary query three ways and checks
+they agree.
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import uuid
+from datetime import date, timedelta
+from functools import partial
+
+from jsonl_scan import event_filter, event_needles, scan
+
+TYPES = ["Event", "Intervention", "Symptom", "Decision", "Thought"]
+
+
+def generate(path: str, count: int):
+    start = date(2022, 1, 1)
+    ids = []
+    with open(path, "w") as f:
+        for i in range(count):
+            day = start + timedelta(days=i * 1500 // count)
+            ts = f"{day.isoformat()}T{random.randrange(24):02d}:{random.randrange(60):02d}:00Z"
+            roll = random.random()
+            if ids and roll < 0.05:
+                # Edit an earlier event (possibly moving it to another day)
+                event_id = random.choice(ids)
+                record = {"id": event_id, "client_timestamp": ts, "type": random.choice(TYPES),
+                          "text": "edited", "metrics": {}, "meta": {"version": 1}}
+            elif ids and roll < 0.08:
+                record = {"id": random.choice(ids), "client_timestamp": ts, "type": "Event", "text": "",
+                          "metrics": {}, "meta": {"version": 1, "deleted": True}}
+            else:
+                event_id = str(uuid.uuid4())
+                ids.append(event_id)
+                record = {"id": event_id, "client_timestamp": ts, "type": random.choice(TYPES),
+                          "text": f"Took magnesium {random.randrange(500)}mg and walked {random.randrange(10)} km",
+                          "metrics": {"dose_mg": random.randrange(500)}, "meta": {"version": 1}}
+            record["received_at"] = ts
+            f.write(json.dumps(record) + "\n")
+
+
+def plain(path: str, day: str) -> dict[str, dict]:
+    """Decode every line on one core, as the scripts used to."""
+    latest = {}
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                event = json.loads(line)
+                latest[event["id"]] = event
+    return {k: e for k, e in latest.items()
+            if not e.get("meta", {}).get("deleted") and e["client_timestamp"].startswith(day)}
+
+
+def timed(label: str, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<28} {elapsed:7.2f} s  ({len(result)} events)")
+    return result, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the parallel JSONL scanner")
+    parser.add_argument("--file", help="Existing events.jsonl (default: generate one)")
+    parser.add_argument("--events", type=int, default=2_000_000, help="Lines to generate")
+    parser.add_argument("--date", help="Day to summarize (default: a day in the middle)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.file
+        if path is None:
+            path = os.path.join(tmp, "events.jsonl")
+            print(f"Generating {args.events} lines...")
+            generate(path, args.events)
+        day = args.date or (date(2022, 1, 1) + timedelta(days=750)).isoformat()
+        print(f"{path}: {os.path.getsize(path) / 1e6:.0f} MB, day {day}, {os.cpu_count()} CPUs")
+
+        match = partial(event_filter, date=day)
+        needles = event_needles(date=day)
+        expected, base = timed("json.loads every line", lambda: plain(path, day))
+        single, one = timed("scan, 1 process", lambda: scan(path, needles=needles, match=match, workers=1))
+        multi, many = timed(f"scan, {os.cpu_count()} processes", lambda: scan(path, needles=needles, match=match))
+        assert expected == single == multi, "scanner results differ from the plain pass"
+        print(f"  speedup: {base / one:.1f}x (prefilter), {base / many:.1f}x (prefilter + processes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Lagged correlations between interventions and symptoms / diary scales.
+
+Usage:
+    python correlate.py --events /path/to/events.jsonl --diary /path/to/diary.jsonl
+    python correlate.py --max-lag 3 --exposure magnesium --outcome headache
+
+Features are cached per day in <derived>/correlations.json (the same cache
+GET /correlations uses), so a rerun only recomputes the days touched by
+lines appended since the last run.
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "02_backend"))
+
+from app.correlations import CorrelationEngine  # noqa: E402
+from app.index import DiaryIndex, EventIndex  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lagged intervention → symptom correlations")
+    parser.add_argument("--events", default=os.environ.get("HUXA_EVENTS_FILE", "/var/lib/huxa/events.jsonl"))
+    parser.add_argument("--diary", default=os.environ.get("HUXA_DIARY_FILE", "/var/lib/huxa/diary.jsonl"))
+    parser.add_argument("--derived", default=os.environ.get("HUXA_DERIVED_DIR", "/var/lib/huxa/derived"))
+    parser.add_argument("--max-lag", type=int, default=3, help="Largest lag in days (default: 3)")
+    parser.add_argument("--min-exposed", type=int, default=3, help="Minimum exposed days per pair (default: 3)")
+    parser.add_argument("--exposure", help="Only exposures containing this text")
+    parser.add_argument("--outcome", help="Only outcomes containing this text")
+    parser.add_argument("-n", "--limit", type=int, default=30)
+    args = parser.parse_args()
+
+    derived = Path(args.derived)
+    # Same snapshot as the backend's event index, so only the log's tail is replayed
+    events = EventIndex(Path(args.events), snapshot=derived / "events.snapshot.json")
+    diary = DiaryIndex(Path(args.diary))
+    engine = CorrelationEngine(derived / "correlations.json", Path(args.events), Path(args.diary))
+    updated = engine.update(lambda day: events.between(day, day), diary.get)
+    events.checkpoint()
+    print(f"Recomputed {updated} day(s)")
+
+    results = [
+        r for r in engine.results(args.max_lag, args.min_exposed)
+        if (not args.exposure or args.exposure in r["exposure"]) and (not args.outcome or args.outcome in r["outcome"])
+    ]
+    print(f"{'exposure':<28} {'outcome':<24} {'lag':>3} {'r':>7} {'effect':>8} {'n':>5} {'exp':>5}")
+    for r in results[:args.limit]:
+        print(f"{r['exposure']:<28} {r['outcome']:<24} {r['lag']:>3} {r['r']:>7.3f} {r['effect']:>8.3f} {r['n']:>5} {r['exposed']:>5}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,27 +5,162 @@ Usage:
     python export_jsonl.py /path/to/events.jsonl --type Intervention
     python export_jsonl.py /path/to/events.jsonl --since 2026-02-01
     python export_jsonl.py /path/to/events.jsonl --type Symptom --since 2026-02-01
+    python export_jsonl.py /path/to/events.jsonl --diary /path/to/diary.jsonl --parquet export/
+
+Only the latest version of each event is exported, and deleted events are
+left out. The log is scanned in parallel (see jsonl_scan.py).
+
+With --parquet, the compacted events (and diary entries, with --diary) are
+written as Parquet files partitioned by month:
+
+    export/events/month=2026-02/data.parquet
+    export/diary/month=2026-02/data.parquet
+
+`metrics` and `answers` keys become `metrics.<key>` / `answers.<key>`
+columns. Column types are worked out over the whole table, so every
+partition has the same schema. A manifest records a hash of every
+partition, so a later export rewrites only the months whose data (or
+the table schema) changed. Requires pyarrow.
 """
 
 import argparse
+import hashlib
 import json
+import os
+import shutil
 import sys
+from functools import partial
+from pathlib import Path
+
+from jsonl_scan import event_filter, event_needles, scan
 
 
 def export_events(filepath: str, event_type: str | None = None, since: str | None = None):
-    with open(filepath) as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            event = json.loads(line)
+    matches = scan(
+        filepath,
+        needles=event_needles(event_type),
+        match=partial(event_filter, event_type=event_type, since=since),
+        days=(since[:10], "9999-12-31") if since else None,
+    )
+    for event in sorted(matches.values(), key=lambda e: e["client_timestamp"]):
+        print(json.dumps(event))
 
-            if event_type and event["type"] != event_type:
-                continue
-            if since and event["client_timestamp"] < since:
+
+def _flatten(record: dict, nested: str) -> dict:
+    row = {k: v for k, v in record.items() if k not in (nested, "meta")}
+    for k, v in record.get(nested, {}).items():
+        row[f"{nested}.{k}"] = v
+    return row
+
+
+def schema(rows: list[dict]) -> dict[str, str]:
+    """One type per column over all ``rows``: ``int64``, ``double``, ``bool``, ``string`` or ``json``.
+
+    Numbers stay numbers (ints widen to double when mixed); a column with
+    any other mix of types, or with lists or objects, is stored as JSON
+    text. A column that is always null is typed ``string``.
+    """
+    seen: dict[str, set[type]] = {}
+    for row in rows:
+        for name, value in row.items():
+            types = seen.setdefault(name, set())
+            if value is not None:
+                types.add(type(value))
+    columns = {}
+    for name in sorted(seen):
+        types = seen[name]
+        if types == {int}:
+            columns[name] = "int64"
+        elif types and types <= {int, float}:
+            columns[name] = "double"
+        elif types == {bool}:
+            columns[name] = "bool"
+        elif types <= {str}:
+            columns[name] = "string"
+        else:
+            columns[name] = "json"
+    return columns
+
+
+def _coerce(row: dict, columns: dict[str, str]) -> dict:
+    """``row`` with every value converted to its column's type."""
+    out = {}
+    for name, kind in columns.items():
+        value = row.get(name)
+        if value is not None:
+            if kind == "double":
+                value = float(value)
+            elif kind == "json" and not isinstance(value, str):
+                value = json.dumps(value)
+        out[name] = value
+    return out
+
+
+def partitions(records: list[dict], date_field: str, nested: str) -> tuple[dict[str, str], dict[str, list[dict]]]:
+    """The table schema and its rows per month (``YYYY-MM`` of ``date_field``), sorted by that field."""
+    rows = [(record[date_field][:7], _flatten(record, nested))
+            for record in sorted(records, key=lambda r: r[date_field])]
+    columns = schema([row for _, row in rows])
+    months: dict[str, list[dict]] = {}
+    for month, row in rows:
+        months.setdefault(month, []).append(_coerce(row, columns))
+    return columns, months
+
+
+def _digest(columns: dict[str, str], rows: list[dict]) -> str:
+    return hashlib.sha256(json.dumps([columns, rows], sort_keys=True).encode()).hexdigest()
+
+
+def write_parquet(path: Path, columns: dict[str, str], rows: list[dict]):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = {"int64": pa.int64(), "double": pa.float64(), "bool": pa.bool_(), "string": pa.string(), "json": pa.string()}
+    table = pa.Table.from_pylist(rows, schema=pa.schema([(name, types[kind]) for name, kind in columns.items()]))
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    pq.write_table(table, tmp, compression="zstd")
+    os.replace(tmp, path)
+
+
+def export_parquet(out_dir: str, events_path: str, diary_path: str | None = None):
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        print("Error: --parquet requires pyarrow (pip install pyarrow)")
+        sys.exit(1)
+
+    out = Path(out_dir)
+    manifest_path = out / "manifest.json"
+    try:
+        manifest = json.loads(manifest_path.read_text())
+    except (FileNotFoundError, ValueError):
+        manifest = {}
+
+    tables = {"events": partitions(list(scan(events_path).values()), "client_timestamp", "metrics")}
+    if diary_path:
+        tables["diary"] = partitions(list(scan(diary_path, key="date").values()), "date", "answers")
+
+    for table, (columns, months) in tables.items():
+        previous = manifest.get(table, {})
+        current = {}
+        written = 0
+        for month, rows in months.items():
+            current[month] = _digest(columns, rows)
+            path = out / table / f"month={month}" / "data.parquet"
+            if previous.get(month) == current[month] and path.exists():
                 continue
+            path.parent.mkdir(parents=True, exist_ok=True)
+            write_parquet(path, columns, rows)
+            written += 1
+        for month in set(previous) - set(current):
+            shutil.rmtree(out / table / f"month={month}", ignore_errors=True)
+        manifest[table] = current
+        print(f"{table}: {written} of {len(current)} partition(s) written", file=sys.stderr)
 
-            print(json.dumps(event))
+    out.mkdir(parents=True, exist_ok=True)
+    tmp = manifest_path.with_name(f"manifest.json.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    os.replace(tmp, manifest_path)
 
 
 if __name__ == "__main__":
@@ -33,6 +168,11 @@ if __name__ == "__main__":
     parser.add_argument("filepath", help="Path to events.jsonl")
     parser.add_argument("--type", dest="event_type", help="Filter by event type")
     parser.add_argument("--since", help="Filter events on or after this date (YYYY-MM-DD)")
+    parser.add_argument("--parquet", metavar="DIR", help="Write month-partitioned Parquet files to DIR")
+    parser.add_argument("--diary", help="Path to diary.jsonl (with --parquet)")
     args = parser.parse_args()
 
-    export_events(args.filepath, args.event_type, args.since)
+    if args.parquet:
+        export_parquet(args.parquet, args.filepath, args.diary)
+    else:
+        export_events(args.filepath, args.event_type, args.since)
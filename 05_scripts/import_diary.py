@@ -1,11 +1,26 @@
 #!/usr/bin/env python3
-"""Import Obsidian diary .md files into diary.jsonl using OpenAI extraction."""
+"""Import Obsidian diary .md files into diary.jsonl using OpenAI extraction.
+
+Files are extracted concurrently (--workers, --rate) and each entry is
+appended straight to the diary file under an exclusive flock, so it is
+safe to point at the live /var/lib/huxa/diary.jsonl while the backend is
+running. A manifest of content hashes is updated after every appended
+entry: unchanged files are skipped, and an interrupted run picks up where
+it stopped. A changed file is re-imported as a new version of its date.
+"""
 
 import argparse
+import fcntl
+import hashlib
 import json
+import os
+import re
 import sys
+import threading
+import time
 import uuid
-from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timezone
 from pathlib import Path
 
 from openai import OpenAI
@@ -25,6 +40,31 @@ EXTRACTION_PROMPT = """Extract structured diary data from this markdown. Return
 
 Return ONLY valid JSON, no markdown fences or extra text."""
 
+ISO_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+def valid_date(value) -> bool:
+    """True for a real calendar date written as YYYY-MM-DD."""
+    if not isinstance(value, str) or not ISO_DATE.match(value):
+        return False
+    try:
+        date.fromisoformat(value)
+    except ValueError:
+        return False
+    return True
+
+
+def entry_date(extracted_date, md_path: Path) -> str:
+    """The entry's date key: the extracted one if valid, else the file name's.
+
+    The date is the diary's record key, so nothing else may be appended;
+    raises ValueError when neither is a valid date.
+    """
+    for candidate in (extracted_date, md_path.stem):
+        if valid_date(candidate):
+            return candidate
+    raise ValueError(f"no valid YYYY-MM-DD date (extracted {extracted_date!r})")
+
 
 def import_file(client: OpenAI, md_path: Path) -> dict | None:
     content = md_path.read_text(encoding="utf-8")
@@ -38,6 +78,7 @@ def import_file(client: OpenAI, md_path: Path) -> dict | None:
             {"role": "system", "content": EXTRACTION_PROMPT},
             {"role": "user", "content": f"Filename: {md_path.name}\n\n{content}"},
         ],
+        response_format={"type": "json_object"},
     )
 
     raw = response.choices[0].message.content.strip()
@@ -48,25 +89,74 @@ def import_file(client: OpenAI, md_path: Path) -> dict | None:
             raw = raw[:-3].strip()
 
     extracted = json.loads(raw)
-    date = extracted.pop("date", md_path.stem)
+    entry_day = entry_date(extracted.pop("date", None), md_path)
 
     return {
         "id": str(uuid.uuid4()),
-        "date": date,
+        "date": entry_day,
         "answers": extracted,
         "saved_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
         "meta": {"version": 1},
     }
 
 
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across all threads."""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate > 0 else 0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            at = max(now, self._next)
+            self._next = at + self.interval
+        time.sleep(max(0.0, at - now))
+
+
+def file_hash(md_path: Path) -> str:
+    return hashlib.sha256(md_path.read_bytes()).hexdigest()
+
+
+def load_manifest(path: Path) -> dict:
+    try:
+        return json.loads(path.read_text())
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_manifest(path: Path, manifest: dict):
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    os.replace(tmp, path)
+
+
+def append_entry(output_path: Path, entry: dict):
+    """Append one line under the same exclusive flock the backend's writer takes."""
+    with open(output_path, "ab") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            f.write((json.dumps(entry) + "\n").encode())
+            f.flush()
+            os.fsync(f.fileno())
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
 def main():
     parser = argparse.ArgumentParser(description="Import Obsidian diary files to diary.jsonl")
     parser.add_argument("input_dir", help="Directory containing .md diary files")
     parser.add_argument(
         "-o", "--output",
-        default="diary_import.jsonl",
-        help="Output JSONL file (default: diary_import.jsonl)",
+        default=os.environ.get("HUXA_DIARY_FILE", "diary_import.jsonl"),
+        help="Diary file to append to (default: $HUXA_DIARY_FILE or diary_import.jsonl)",
     )
+    parser.add_argument("--manifest", help="Manifest of imported files (default: <output>.import.json)")
+    parser.add_argument("-j", "--workers", type=int, default=4, help="Concurrent OpenAI requests (default: 4)")
+    parser.add_argument("--rate", type=float, default=5.0, help="Max requests per second, 0 for no limit (default: 5)")
+    parser.add_argument("--force", action="store_true", help="Re-import files even if unchanged")
     args = parser.parse_args()
 
     input_dir = Path(args.input_dir)
@@ -79,24 +169,53 @@ def main():
         print(f"No .md files found in {input_dir}")
         sys.exit(1)
 
-    client = OpenAI()  # uses OPENAI_API_KEY env var
     output_path = Path(args.output)
-    count = 0
-
-    with open(output_path, "a") as f:
-        for md_path in md_files:
-            print(f"Processing: {md_path.name}")
+    manifest_path = Path(args.manifest) if args.manifest else output_path.with_name(output_path.name + ".import.json")
+    manifest = load_manifest(manifest_path)
+
+    pending = []
+    for md_path in md_files:
+        digest = file_hash(md_path)
+        if not args.force and manifest.get(md_path.name, {}).get("sha256") == digest:
+            continue
+        pending.append((md_path, digest))
+    print(f"{len(pending)} of {len(md_files)} files new or changed")
+
+    client = OpenAI(max_retries=5)  # uses OPENAI_API_KEY env var; retries 429s with backoff
+    limiter = RateLimiter(args.rate)
+    count = errors = 0
+
+    def extract(md_path: Path):
+        limiter.wait()
+        return import_file(client, md_path)
+
+    pool = ThreadPoolExecutor(max_workers=args.workers)
+    try:
+        futures = {pool.submit(extract, md_path): (md_path, digest) for md_path, digest in pending}
+        for future in as_completed(futures):
+            md_path, digest = futures[future]
             try:
-                entry = import_file(client, md_path)
-                if entry:
-                    f.write(json.dumps(entry) + "\n")
-                    count += 1
-                    print(f"  -> {entry['date']}")
+                entry = future.result()
             except Exception as e:
-                print(f"  Error: {e}")
-
-    print(f"\nDone. Imported {count} entries to {output_path}")
-    print(f"To deploy: cat {output_path} >> /var/lib/huxa/diary.jsonl")
+                errors += 1
+                print(f"  Error: {md_path.name}: {e}")
+                continue
+            if entry:
+                append_entry(output_path, entry)
+                count += 1
+                print(f"  {md_path.name} -> {entry['date']}")
+            # Checkpoint: this file is done even if the run stops now
+            manifest[md_path.name] = {"sha256": digest, "date": entry["date"] if entry else None}
+            save_manifest(manifest_path, manifest)
+    except KeyboardInterrupt:
+        pool.shutdown(wait=False, cancel_futures=True)
+        print(f"\nInterrupted after {count} entries. Run again to resume.", flush=True)
+        # In-flight extractions are only ever appended by this thread, so
+        # dropping them is safe; don't wait for their HTTP calls to finish
+        os._exit(130)
+    pool.shutdown()
+
+    print(f"\nDone. Imported {count} entries to {output_path}" + (f" ({errors} failed, rerun to retry)" if errors else ""))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,174 @@
+"""
+Parallel scanner for large append-only JSONL logs.
+
+The file is memory-mapped and split into newline-aligned chunks that are
+parsed in a process pool. Lines that don't contain every byte string in
+`needles` are not decoded; only their record key is read, as a marker that
+a later version of that record exists. Chunk results are merged in file
+order, so the latest version of each record wins and deleted records (or
+records whose latest version no longer matches) drop out.
+
+Segmented logs (see 02_backend/app/segments.py) are scanned one sealed
+segment per task, followed by the active file. With ``days``, segments
+whose lines can't affect any day in that range are skipped entirely.
+
+Usage:
+    from functools import partial
+    from jsonl_scan import event_filter, event_needles, scan
+
+    events = scan("events.jsonl", needles=event_needles(date="2026-02-14"),
+                  match=partial(event_filter, date="2026-02-14"))
+"""
+
+import json
+import mmap
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "02_backend"))
+
+from app import segments  # noqa: E402
+
+# Below this size the file is scanned in-process; a pool costs more than it saves
+MIN_PARALLEL_BYTES = 64 * 1024 * 1024
+CHUNK_BYTES = 32 * 1024 * 1024
+
+
+def chunks(path: str, chunk_bytes: int = CHUNK_BYTES) -> list[tuple[int, int]]:
+    """Byte ranges of roughly ``chunk_bytes`` that each end just after a newline."""
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+    ranges = []
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        start = 0
+        while start < size:
+            end = mm.find(b"\n", min(start + chunk_bytes, size) - 1)
+            end = size if end == -1 else end + 1
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def _key_pattern(key: str) -> re.Pattern:
+    return re.compile(rb'"' + key.encode() + rb'"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+
+def _scan_chunk(path: str, start: int, end: int, key: str, needles: tuple[bytes, ...],
+                match: Optional[Callable[[dict], bool]]) -> dict[str, Optional[dict]]:
+    """Latest record per key within ``[start, end)``; None where the latest one is filtered out."""
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        data = mm[start:end]
+    return _scan_bytes(data, key, needles, match)
+
+
+def _scan_segment(path: str, segment: dict, key: str, needles: tuple[bytes, ...],
+                  match: Optional[Callable[[dict], bool]]) -> dict[str, Optional[dict]]:
+    """Like ``_scan_chunk``, for one sealed segment of a segmented log."""
+    with segments.open_segment(Path(path), segment) as f:
+        data = f.read()
+    return _scan_bytes(data, key, needles, match)
+
+
+def _scan_bytes(data: bytes, key: str, needles: tuple[bytes, ...],
+                match: Optional[Callable[[dict], bool]]) -> dict[str, Optional[dict]]:
+    pattern = _key_pattern(key)
+    # The writer's own formatting; anything else falls back to the regex
+    prefix = b'"' + key.encode() + b'": "'
+    latest: dict[str, Optional[dict]] = {}
+    for line in data.split(b"\n"):
+        if not line.strip():
+            continue
+        if all(n in line for n in needles):
+            record = json.loads(line)
+            ident = record[key]
+            keep = not record.get("meta", {}).get("deleted") and (match is None or match(record))
+            latest[ident] = record if keep else None
+            continue
+        # Not a candidate, but it still supersedes earlier versions
+        i = line.find(prefix)
+        j = line.find(b'"', i + len(prefix)) if i != -1 else -1
+        if j != -1 and b"\\" not in line[i:j]:
+            ident = line[i + len(prefix):j].decode()
+        else:
+            m = pattern.search(line)
+            ident = json.loads(b'"' + m.group(1) + b'"') if m else json.loads(line)[key]
+        latest[ident] = None
+    return latest
+
+
+def event_filter(event: dict, event_type: Optional[str] = None, date: Optional[str] = None,
+                 since: Optional[str] = None) -> bool:
+    """Exact event filter for ``scan(match=partial(event_filter, ...))``."""
+    ts = event.get("client_timestamp", "")
+    return ((event_type is None or event.get("type") == event_type)
+            and (date is None or ts.startswith(date))
+            and (since is None or ts >= since))
+
+
+def event_needles(event_type: Optional[str] = None, date: Optional[str] = None) -> list[bytes]:
+    """Byte prefilter matching ``event_filter`` (``since`` has no byte-level test)."""
+    needles = []
+    if event_type:
+        needles.append(json.dumps(event_type).encode())
+    if date:
+        needles.append(b'"' + date.encode())
+    return needles
+
+
+def scan(path: str, key: str = "id", needles: Iterable[bytes] = (),
+         match: Optional[Callable[[dict], bool]] = None, workers: Optional[int] = None,
+         chunk_bytes: int = CHUNK_BYTES, days: Optional[tuple[str, str]] = None) -> dict[str, dict]:
+    """Latest live version of every record by ``key`` that passes the filters.
+
+    ``needles`` is a cheap prefilter: a line is only decoded if it contains
+    all of them. ``match`` is the exact filter on decoded records and must be
+    picklable (a module-level function or a ``functools.partial`` of one).
+    ``workers`` defaults to the number of CPUs. ``days`` (``(from, to)``,
+    inclusive) promises that ``match`` only accepts records on those days,
+    which lets a segmented log skip the segments that can't affect them.
+    """
+    needles = tuple(needles)
+    if segments.load(Path(path)) is not None:
+        return _scan_segmented(path, key, needles, match, workers, days)
+    ranges = chunks(path, chunk_bytes)
+    if not ranges:
+        return {}
+    if workers == 1 or len(ranges) == 1 or (workers is None and os.path.getsize(path) < MIN_PARALLEL_BYTES):
+        parts = [_scan_chunk(path, start, end, key, needles, match) for start, end in ranges]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_scan_chunk, path, start, end, key, needles, match) for start, end in ranges]
+            parts = [f.result() for f in futures]
+
+    merged: dict[str, Optional[dict]] = {}
+    for part in parts:
+        merged.update(part)
+    return {k: r for k, r in merged.items() if r is not None}
+
+
+def _scan_segmented(path: str, key: str, needles: tuple[bytes, ...], match: Optional[Callable[[dict], bool]],
+                    workers: Optional[int], days: Optional[tuple[str, str]]) -> dict[str, dict]:
+    # The active file and the manifest are read together under its lock, so a
+    # seal in between can't drop lines; sealed segments never change after
+    with segments.active(Path(path)) as (f, manifest, _):
+        active = f.read()
+    sealed = segments.overlapping(manifest, *days) if days else manifest["segments"]
+    size = sum(s["length"] for s in sealed)
+    if workers == 1 or len(sealed) < 2 or (workers is None and size < MIN_PARALLEL_BYTES):
+        parts = [_scan_segment(path, s, key, needles, match) for s in sealed]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_scan_segment, path, s, key, needles, match) for s in sealed]
+            parts = [f.result() for f in futures]
+    # Only complete lines; a write in progress is left out
+    parts.append(_scan_bytes(active[:active.rfind(b"\n") + 1], key, needles, match))
+
+    merged: dict[str, Optional[dict]] = {}
+    for part in parts:
+        merged.update(part)
+    return {k: r for k, r in merged.items() if r is not None}
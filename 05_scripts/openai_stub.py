@@ -0,0 +1,78 @@
+"""
+Local stand-in for the OpenAI chat completions API, for development and load tests.
+
+Usage:
+    python openai_stub.py --port 8089 --delay 0.5
+    OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=stub uvicorn app.main:app
+
+Every POST to /v1/chat/completions waits --delay seconds and answers with a
+short canned completion (an empty JSON object when JSON output was
+requested). With --fail-rate, that fraction of requests gets a 500 so
+retries can be exercised.
+"""
+
+import argparse
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_handler(delay: float, fail_rate: float):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            time.sleep(delay)
+
+            if not self.path.endswith("/chat/completions"):
+                self._send(404, {"error": {"message": "Not found"}})
+                return
+            if random.random() < fail_rate:
+                self._send(500, {"error": {"message": "Stub failure"}})
+                return
+
+            wants_json = body.get("response_format", {}).get("type") == "json_object"
+            prompt_chars = sum(len(m.get("content") or "") for m in body.get("messages", []))
+            content = "{}" if wants_json else "Stub answer."
+            self._send(200, {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "stub"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_chars // 4,
+                    "completion_tokens": len(content) // 4 + 1,
+                    "total_tokens": prompt_chars // 4 + len(content) // 4 + 1,
+                },
+            })
+
+        def _send(self, status: int, payload: dict):
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local OpenAI chat completions stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds to wait before answering")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(args.delay, args.fail_rate))
+    print(f"OpenAI stub on http://{args.host}:{args.port}/v1")
+    server.serve_forever()
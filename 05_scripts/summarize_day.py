@@ -5,24 +5,24 @@ Usage:
     python summarize_day.py /path/to/events.jsonl 2026-02-14
 """
 
-import json
 import sys
 from collections import Counter
+from functools import partial
+
+from jsonl_scan import event_filter, event_needles, scan
 
 
 def summarize_day(filepath: str, date: str):
     counts = Counter()
     events = []
 
-    with open(filepath) as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            event = json.loads(line)
-            if event["client_timestamp"].startswith(date):
-                counts[event["type"]] += 1
-                events.append(event)
+    # Latest version of each event, deleted ones left out; only lines
+    # mentioning the date are decoded
+    matches = scan(filepath, needles=event_needles(date=date), match=partial(event_filter, date=date),
+                   days=(date, date))
+    for event in sorted(matches.values(), key=lambda e: e["client_timestamp"]):
+        counts[event["type"]] += 1
+        events.append(event)
 
     print(f"Summary for {date}")
     print(f"Total events: {len(events)}")
@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+from export_jsonl import export_parquet
+
+pa = pytest.importorskip("pyarrow")
+ds = pytest.importorskip("pyarrow.dataset")
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+def write_jsonl(path, records):
+    path.write_text("".join(json.dumps(r) + "\n" for r in records))
+
+
+def test_partitions_share_one_schema(tmp_path):
+    events = tmp_path / "events.jsonl"
+    diary = tmp_path / "diary.jsonl"
+    write_jsonl(events, [
+        {"id": "a", "type": "Intervention", "text": "magnesium", "client_timestamp": "2026-01-10T08:00:00",
+         "metrics": {"dose": 200, "note": "tablet"}},
+        {"id": "b", "type": "Intervention", "text": "magnesium", "client_timestamp": "2026-02-10T08:00:00",
+         "metrics": {"dose": 150.5, "note": {"form": "powder"}}},
+    ])
+    write_jsonl(diary, [
+        {"date": "2026-01-10", "answers": {"sleep": 7}},
+        {"date": "2026-02-10", "answers": {"sleep": "poor"}},
+    ])
+    out = tmp_path / "export"
+    export_parquet(str(out), str(events), str(diary))
+
+    table = ds.dataset(out / "events", format="parquet", partitioning="hive").to_table()
+    assert table.schema.field("metrics.dose").type == pa.float64()
+    assert table.schema.field("metrics.note").type == pa.string()
+    january, february = (pq.read_schema(out / "events" / f"month={m}" / "data.parquet") for m in ("2026-01", "2026-02"))
+    assert january.equals(february)
+    rows = sorted(table.to_pylist(), key=lambda r: r["id"])
+    assert [r["metrics.dose"] for r in rows] == [200.0, 150.5]
+    assert [r["metrics.note"] for r in rows] == ["tablet", '{"form": "powder"}']
+    assert [r["month"] for r in rows] == ["2026-01", "2026-02"]
+
+    diary_table = ds.dataset(out / "diary", format="parquet", partitioning="hive").to_table()
+    assert diary_table.schema.field("answers.sleep").type == pa.string()
+    assert sorted(diary_table.column("answers.sleep").to_pylist()) == ["7", "poor"]
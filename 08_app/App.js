@@ -309,13 +309,33 @@ function AppContent() {
     saveQueueItems(items);
   }
 
+  function flushQueuedEvents(items) {
+    var pending = items.filter(function (item) { return item.kind === "event" && (item.status === "pending" || item.status === "failed"); });
+    if (pending.length === 0) return Promise.resolve(false);
+    return fetch(API_BASE + "/events/batch", { method: "POST", headers: authHeaders(), body: JSON.stringify(pending.map(function (item) { return item.payload; })) })
+      .then(function (res) {
+        if (!res.ok) throw new Error("HTTP " + res.status);
+        return res.json();
+      })
+      .then(function (body) {
+        body.results.forEach(function (r) {
+          var item = pending[r.index];
+          if (r.status === "invalid") { item.status = "failed"; item.error = r.error; }
+          else { items.splice(items.indexOf(item), 1); }
+        });
+        return true;
+      });
+  }
+
   function processQueueFn() {
     var items = queue.slice();
     var changed = false;
+    var batched = false;
     var process = function (i) {
       if (i >= items.length) { if (changed) saveQueueItems(items); return; }
       var item = items[i];
       if (item.status !== "pending" && item.status !== "failed") { process(i + 1); return; }
+      if (batched && item.kind === "event") { process(i + 1); return; }
       var endpoint = item.kind === "diary" ? "/diary" : item.kind === "feedback" ? "/reports" : "/events";
       fetch(API_BASE + endpoint, { method: "POST", headers: authHeaders(), body: JSON.stringify(item.payload) })
         .then(function (res) {
@@ -327,7 +347,11 @@ function AppContent() {
           item.status = "failed"; item.error = err.message; changed = true; process(i + 1);
         });
     };
-    process(0);
+    // Events go up in one batch request; anything else (or an older server
+    // without /events/batch) falls back to one request per item.
+    flushQueuedEvents(items)
+      .then(function (flushed) { if (flushed) { batched = true; changed = true; } process(0); })
+      .catch(function (err) { if (err instanceof TypeError) return; process(0); });
   }
 
   var processQueueRef = useRef(processQueueFn);
@@ -396,6 +420,43 @@ function AppContent() {
     }
   }
 
+  var historyRef = useRef(null);
+  historyRef.current = { tab: historyTab, date: historyDate, events: historyEvents, fetch: doFetchHistory };
+
+  // Live updates while the history screen is open: the server pushes every
+  // event change over SSE and the shown day is reloaded when a change touches
+  // it. EventSource can't send the Authorization header, so each connection
+  // opens with a short-lived stream token and resumes from the last cursor.
+  // Native builds without EventSource keep the manual refresh.
+  useEffect(function () {
+    if (screen !== "history" || !token || typeof EventSource === "undefined") return;
+    var source = null, retry = null, reload = null, cursor = null, stopped = false;
+    function schedule() { if (!stopped) retry = setTimeout(connect, 5000); }
+    function connect() {
+      fetch(API_BASE + "/events/stream/token", { method: "POST", headers: authHeaders() })
+        .then(function (res) { if (!res.ok) throw new Error("HTTP " + res.status); return res.json(); })
+        .then(function (body) {
+          if (stopped) return;
+          source = new EventSource(API_BASE + "/events/stream?token=" + encodeURIComponent(body.token) + (cursor ? "&since=" + cursor : ""));
+          source.addEventListener("ready", function (e) { cursor = e.lastEventId; });
+          source.addEventListener("change", function (e) {
+            cursor = e.lastEventId;
+            var change = JSON.parse(e.data), h = historyRef.current;
+            var shown = h.events.some(function (ev) { return ev.id === change.id; });
+            if (h.tab !== "events" || (!shown && change.client_timestamp.slice(0, 10) !== h.date)) return;
+            clearTimeout(reload);
+            reload = setTimeout(function () { h.fetch("events", historyRef.current.date); }, 300);
+          });
+          source.addEventListener("reset", function () { cursor = null; });
+          // Reconnect ourselves: the token has expired by the time EventSource would retry
+          source.onerror = function () { source.close(); schedule(); };
+        })
+        .catch(schedule);
+    }
+    connect();
+    return function () { stopped = true; clearTimeout(retry); clearTimeout(reload); if (source) source.close(); };
+  }, [screen, token]);
+
   function openHistory() {
     if (!token) { setScreen("token"); return; }
     var d = todayStr(); setHistoryDate(d); setHistoryTab("events"); setScreen("history"); doFetchHistory("events", d);